@@ -0,0 +1,15 @@
+'''
+BattleShell engine package
+
+   - bshell: the Game rules engine
+   - ai: the WaveWatch AI, only imported once a game against it starts
+   - placements, fleet: ship placement tables and hit tracking
+   - bs_protocol, bs_server, bs_client: local multiplayer networking
+   - simulate: headless AI vs AI games
+   - batch: many games played in lockstep on NumPy arrays
+
+Nothing is imported here so that importing one module, ie.
+battleshell.bshell, only loads what that module needs.
+
+Author: Paul Belland
+'''
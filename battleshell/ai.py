@@ -0,0 +1,763 @@
+'''
+WaveWatch Bot V1.1
+
+This bot can generate Battleship moves at multiple difficulty
+levels and at it's highest attempts to play like a human. This file only
+provides moves based on given ship locations and board sizes. 
+
+   - Encapsulated version of Battleshell V1.6 AI
+   - Meant to integrate into kiv_bshell
+   - Allows for much easier updates
+
+Author: Paul Belland
+'''
+
+import random
+from collections import Counter
+from .placements import placement_table, sample_fleet
+from .fleet import Fleet
+from .snapshot import CORRUPT_ERRORS, SnapshotReader, SnapshotWriter
+from .perf import hot, instrumented
+try:
+   import numpy as np
+except ImportError:   # falls back to the pure python heatmap
+   np = None
+VERSION = 1.1
+
+# to humanize adv. search, a number between 0 and seed
+# is randomly chosen and represents the number of random
+# shots the computer will take before using adv. search
+ADV_SEARCH_SEED = 3
+
+# snapshot encodings
+SNAPSHOT_MAGIC = b'BSW'
+ORIENTATIONS = ('h', 'v')
+FAULTS = ('EXTENSION', 'SINK_MISMATCH')
+
+
+'''
+PROBABILITY DENSITY - START
+'''
+
+def density_map(b_size, shots, ship_lengths):
+   '''
+   Returns a flat list with, for every cell, the number of placements
+   of the remaining ships covering it without touching a shot cell
+   '''
+   if np is not None:
+      return np_density(b_size, shots, ship_lengths).tolist()
+   return py_density(b_size, shots, ship_lengths)
+
+def np_density(b_size, shots, ship_lengths):
+   '''
+   Vectorized heatmap, counts for every cell how many placements of
+   the remaining ships cover it. Returns a flat array
+   '''
+   blocked = np.zeros(b_size * b_size, dtype=np.int32)
+   blocked[list(shots)] = 1
+   blocked = blocked.reshape(b_size, b_size)
+
+   # horizontal windows on the board, vertical on its transpose
+   heat = np.zeros((b_size, b_size), dtype=np.int32)
+   for length, count in Counter(ship_lengths).items():
+      if length > b_size:
+         continue
+      lines = np_line_density(blocked, length) + np_line_density(blocked.T, length).T
+      heat += count * lines
+   return heat.ravel()
+
+def np_line_density(blocked, length):
+   '''
+   Counts the horizontal placements of one ship covering each cell,
+   using prefix sums so every window is checked at once
+   '''
+   rows, cols = blocked.shape
+   starts = cols - length + 1
+
+   # a start fits when its window holds no shot cells
+   shot_sum = np.zeros((rows, cols + 1), dtype=np.int32)
+   np.cumsum(blocked, axis=1, out=shot_sum[:, 1:])
+   fits = (shot_sum[:, length:] - shot_sum[:, :starts]) == 0
+
+   # each cell is covered by the fitting starts in [col-length+1, col]
+   fit_sum = np.zeros((rows, starts + 1), dtype=np.int32)
+   np.cumsum(fits, axis=1, out=fit_sum[:, 1:])
+   col = np.arange(cols)
+   upper = np.minimum(col, starts - 1) + 1
+   lower = np.maximum(col - length + 1, 0)
+   return fit_sum[:, upper] - fit_sum[:, lower]
+
+def py_density(b_size, shots, ship_lengths):
+   '''
+   Pure python heatmap used when numpy is not installed. Walks each
+   run of unshot cells in every row and column. Returns a flat list
+   '''
+   shot_set = set(shots)
+   lengths = Counter(ship_lengths).items()
+   heat = [0] * (b_size * b_size)
+   lines = []
+   for i in range(b_size):
+      lines.append(range(i * b_size, (i + 1) * b_size))   # row
+      lines.append(range(i, b_size * b_size, b_size))   # column
+
+   for line in lines:
+      run = []
+      for cell in list(line) + [None]:   # None closes the last run
+         if cell is not None and cell not in shot_set:
+            run.append(cell)
+            continue
+         # a cell at i in a run of size r is covered min(i+1, l, r-l+1, r-i) ways
+         size = len(run)
+         for length, count in lengths:
+            if length > size:
+               continue
+            for i in range(size):
+               heat[run[i]] += count * min(i + 1, length, size - length + 1, size - i)
+         run = []
+   return heat
+
+class CellSet:
+   '''
+   Set of cells with O(1) add, remove and random choice. Cells live in a
+   list with a cell -> position index, removal swaps with the last cell
+   '''
+   def __init__(self, cells=()):
+      self.cells = list(dict.fromkeys(cells))
+      self.positions = dict(zip(self.cells, range(len(self.cells))))
+
+   def __len__(self):
+      return len(self.cells)
+
+   def __contains__(self, cell):
+      return cell in self.positions
+
+   def add(self, cell):
+      '''Adds a cell if not already in the set'''
+      if cell not in self.positions:
+         self.positions[cell] = len(self.cells)
+         self.cells.append(cell)
+
+   def remove(self, cell):
+      '''Removes a cell by swapping it with the last cell'''
+      position = self.positions.pop(cell)
+      last = self.cells.pop()
+      if position < len(self.cells):
+         self.cells[position] = last
+         self.positions[last] = position
+
+   def choice(self, rng=random):
+      '''Returns a random cell from the set, drawn from rng'''
+      return rng.choice(self.cells)
+
+class PlacementIndex:
+   '''
+   Keeps every placement of the remaining ships that avoids the shot
+   cells, with a cell -> placements inverted index and a live placement
+   count per cell. Unshot cells are bucketed by count so the densest
+   cells are always at hand. A shot only touches the placements
+   through that cell, so its cost does not grow as the game goes on
+   '''
+   def __init__(self, b_size, ship_lengths, shots=()):
+      cell_total = b_size ** 2
+      self.b_size = b_size
+      self.weights = Counter(ship_lengths)   # ships left per length
+      self.placements = []   # cells of each live placement
+      self.lengths = []   # ship length of each placement
+      self.alive = bytearray()
+      self.through = [[] for cell in range(cell_total)]   # cell -> placements
+      self.shot = bytearray(cell_total)
+      for cell in shots:
+         self.shot[cell] = 1
+
+      # indexes every placement not touching a shot
+      for length in self.weights:
+         for cells in placement_table(b_size, length).cells:
+            if any(self.shot[cell] for cell in cells):
+               continue
+            placement_id = len(self.placements)
+            self.placements.append(cells)
+            self.lengths.append(length)
+            self.alive.append(1)
+            for cell in cells:
+               self.through[cell].append(placement_id)
+
+      # buckets unshot cells by their starting counts
+      self.counts = density_map(b_size, shots, ship_lengths)
+      self.buckets = {}
+      for cell in range(cell_total):
+         if not self.shot[cell]:
+            self.buckets.setdefault(self.counts[cell], CellSet()).add(cell)
+      self.top = max(self.buckets, default=0)
+
+   def shoot(self, cell):
+      '''
+      Removes a shot cell and every placement passing through it
+      '''
+      if self.shot[cell]:
+         return
+      self.shot[cell] = 1
+      self.buckets[self.counts[cell]].remove(cell)
+
+      changes = Counter()
+      for placement_id in self.through[cell]:
+         if self.alive[placement_id]:
+            self.alive[placement_id] = 0
+            weight = self.weights[self.lengths[placement_id]]
+            for other in self.placements[placement_id]:
+               changes[other] -= weight
+      self.through[cell] = []
+      self.apply_changes(changes)
+
+   def set_lengths(self, ship_lengths):
+      '''
+      Re-weights the placements after ships were sunk. Returns False if
+      a ship length was never indexed and the index must be rebuilt
+      '''
+      weights = Counter(ship_lengths)
+      if weights == self.weights:
+         return True
+      if any(length not in self.weights for length in weights):
+         return False
+
+      changes = Counter()
+      for placement_id in range(len(self.placements)):
+         length = self.lengths[placement_id]
+         delta = weights[length] - self.weights[length]
+         if delta and self.alive[placement_id]:
+            if weights[length] == 0:   # no ships left, drops placement
+               self.alive[placement_id] = 0
+            for cell in self.placements[placement_id]:
+               changes[cell] += delta
+      self.weights = weights
+      self.apply_changes(changes)
+      return True
+
+   def apply_changes(self, changes):
+      '''
+      Moves each changed unshot cell to the bucket of its new count
+      '''
+      for cell, delta in changes.items():
+         old = self.counts[cell]
+         self.counts[cell] = old + delta
+         if not delta or self.shot[cell]:
+            continue
+         self.buckets[old].remove(cell)
+         self.buckets.setdefault(old + delta, CellSet()).add(cell)
+         if old + delta > self.top:
+            self.top = old + delta
+
+   def best_cells(self):
+      '''
+      Returns the cells tied for the highest live count, None if no
+      remaining ship fits anywhere
+      '''
+      while self.top > 0 and not self.buckets.get(self.top):
+         self.top -= 1
+      if self.top == 0:
+         return None
+      return self.buckets[self.top]
+
+@instrumented
+class WaveWatch:
+   def __init__(self,difficulty,b_size,ship_sizes,seed=None):
+      # basic info
+      self.difficulty = difficulty
+      self.b_size = b_size
+      self.ship_sizes = ship_sizes
+      if seed is None or seed is random:   # shares the random module's state
+         self.rng = random
+      elif isinstance(seed, random.Random):
+         self.rng = seed
+      else:
+         self.rng = random.Random(seed)
+      
+      # important
+      self.ship_cells = []
+      self.individual_ships = []
+      self.shots = []
+      self.good_shots = []
+      self.state = 0   # 0 search, 1 sink, 2 stuck
+      self.player_ships = None
+      self.player_cells = None
+      self.player_fleet = None   # own hit counters over the player's fleet
+      self.last_hit = (None, False)   # (ship id, sunk) of the last shot
+      self.adv_seed = self.rng.randint(0,ADV_SEARCH_SEED)
+      self.placement_index = None   # built on first adv. search
+      self.unshot = CellSet(range(b_size ** 2))   # fresh cells for any mode
+      
+      # sink ship
+      self.sink_ship_root = None
+      self.sink_hits = []   # all cells known for ship
+      self.sink_orientation = None
+      self.sink_max = None
+      self.sink_min = None
+      
+      # error correction
+      self.last_shot_result = None  # 0 miss, 1 hit
+      self.state_info = None  # information about fault search
+
+      
+   '''
+   BASIC AI FUNCTIONS - START
+   '''
+      
+   def start(self):
+      '''
+      Starts up AI and calls necessary methods
+      '''
+      self.build_positions()
+      
+   def set_player_pos(self, player_ships, player_cells, fleet=None):
+      '''
+      Keeps track of players positions for future hits. AI cannot
+      use this information to cheat, only checks against to save time.
+      A game's fleet index can be given to avoid rebuilding it
+      '''
+      self.player_ships = player_ships
+      self.player_cells = player_cells
+      if fleet is None:
+         fleet = Fleet(player_ships)
+      self.player_fleet = fleet.tracker()
+      
+   def get_ai_ships(self):
+      '''
+      Returns AI ship cells chosen after starting
+      '''
+      return self.ship_cells, self.individual_ships
+      
+   @hot
+   def get_shot(self):
+      '''
+      When called, based on difficulty, calculates
+      firing solution against player. Returns chosen cell.
+      '''
+      diff = self.difficulty
+      state = self.state
+      if diff == 1:
+         return self.random_shot()
+      elif diff == 2:
+         if state == 0:   # regular shot
+            return self.random_shot()
+         elif state == 1:   # attempt to sink ship
+            return self.sink_ship()
+         elif state == 2:
+            return self.handle_faults()
+      elif diff == 3:
+         if state == 0:  # advanced shot (statistical)
+            if self.adv_seed > 0:
+               self.adv_seed -= 1
+               return self.random_shot()
+            return self.adv_search()
+         elif state == 1:
+            return self.sink_ship()
+         elif state == 2:
+            return self.handle_faults()
+      
+   @hot
+   def add_shot(self, shot):
+      '''
+      Records a shot taken by the AI in any mode
+      '''
+      self.shots.append(shot)
+      if shot in self.unshot:
+         self.unshot.remove(shot)
+      if self.placement_index is not None:
+         self.placement_index.shoot(shot)
+      self.last_hit = self.player_fleet.hit(shot)
+
+   def is_ship_overlap(self,indiv_ship,group_ships):
+      '''
+      Checks if the cells of an individual ship are inside of
+      a larger group of ship cells. If overlap, return True
+      '''
+      for cell in indiv_ship:
+         if cell in group_ships:
+               return True
+      return False
+   
+   def get_ship_cells(self,row,col,orientation,length):
+         '''
+         Returns all occupied ship cells based on ships data
+         '''
+         cells = [self.matrix_to_num(row,col)]   # adds first cell
+         
+         # sets data for placement loop
+         if orientation == 'v':
+               static, dynamic = col, row
+         else:
+               static, dynamic = row, col
+               
+         # placement loop
+         for cell in range(length-1):
+               dynamic += 1
+               if orientation == 'v':
+                  cells.append(self.matrix_to_num(dynamic,static))
+               else:
+                  cells.append(self.matrix_to_num(static,dynamic))
+         return cells
+      
+   def matrix_to_num(self,row:int,col:int) -> int:
+      '''
+      Converts matrix positions into actual grid cells from
+      1 to the size of the actual board
+      '''
+      row_num = row * self.b_size
+      decoded_number = row_num + col
+      return decoded_number
+   
+   def num_to_matrix(self,position:int) -> tuple:
+      '''
+      Converts grid cells to matrix rows and columns
+      based on the size of the board
+      '''
+      row = (position)//self.b_size
+      column = (position)%self.b_size
+      return row, column
+         
+   @hot
+   def build_positions(self):
+      '''
+      Randomly populates ship positions for AI
+      '''
+      fleet = sample_fleet(self.b_size, sorted(self.ship_sizes, reverse=True), rng=self.rng)
+      if fleet is None:
+         raise Exception('Error: No space for remaining ships!')
+      for cells in fleet:
+         self.individual_ships.append(cells)
+         self.ship_cells = self.ship_cells + cells
+               
+   '''
+   SNAPSHOTS - START
+   '''
+
+   def snapshot(self):
+      '''
+      Returns the AI's full state as a versioned byte blob
+      '''
+      writer = SnapshotWriter()
+      writer.add_random(self.rng)
+      self.write_state(writer)
+      return writer.to_bytes(SNAPSHOT_MAGIC)
+
+   @classmethod
+   def restore(cls, data, seed=None):
+      '''
+      Rebuilds a WaveWatch from a snapshot blob. A seeded AI carries on
+      from its saved random state, unless given a new seed
+      '''
+      reader = SnapshotReader(SNAPSHOT_MAGIC, data)
+      try:
+         state = reader.read_random()
+         if seed is None and state is not None:
+            seed = random.Random()
+         ai = cls.read_state(reader, seed)
+      except CORRUPT_ERRORS:
+         raise Exception('Snapshot Error: Corrupt snapshot')
+      reader.finish()
+      if state is not None and ai.rng is seed:   # building the AI drew from it
+         ai.rng.setstate(state)
+      return ai
+
+   def write_state(self, writer):
+      '''
+      Writes the AI's state, used by its own and the Game's snapshots.
+      The placement index is left out and rebuilt on demand
+      '''
+      writer.add(self.difficulty, self.b_size, self.state, self.adv_seed)
+      writer.add_list(self.ship_sizes)
+      writer.add_lists(self.individual_ships)
+      writer.add_list(self.ship_cells)
+      writer.add_list(self.shots)
+      writer.add_list(self.good_shots)
+      writer.add_list(self.unshot.cells)   # in order, random choices depend on it
+
+      # player info, None until set_player_pos
+      writer.add(self.player_ships is not None)
+      if self.player_ships is not None:
+         writer.add_lists(self.player_ships)
+         writer.add_list(self.player_cells)
+         writer.add_lists(self.player_fleet.ships)
+         writer.add_list(self.player_fleet.hit_cells())
+      writer.add(self.last_hit[0], int(self.last_hit[1]))
+
+      # sink mode and faults
+      orientation = None
+      if self.sink_orientation is not None:
+         orientation = ORIENTATIONS.index(self.sink_orientation)
+      writer.add(self.sink_ship_root, orientation, self.sink_max, self.sink_min,
+                 self.last_shot_result)
+      writer.add_list(self.sink_hits)
+      if self.state_info is None:
+         writer.add(None)
+      else:
+         writer.add(FAULTS.index(self.state_info[0]))
+         writer.add_list(self.state_info[1])
+
+   @classmethod
+   def read_state(cls, reader, seed=None):
+      '''
+      Reads back the state written by write_state
+      '''
+      difficulty, b_size, state, adv_seed = reader.read(4)
+      if b_size is None or b_size not in range(2, 27):   # WaveWatch itself trusts it
+         raise Exception(f'Snapshot Error: Bad board size {b_size}')
+      ai = cls(difficulty, b_size, reader.read_list(), seed)
+      ai.state = state
+      ai.adv_seed = adv_seed
+      ai.individual_ships = reader.read_lists()
+      ai.ship_cells = reader.read_list()
+      ai.shots = reader.read_list()
+      ai.good_shots = reader.read_list()
+      ai.unshot = CellSet(reader.read_list())
+
+      # player info
+      if reader.read():
+         ai.player_ships = reader.read_lists()
+         ai.player_cells = reader.read_list()
+         ai.player_fleet = Fleet(reader.read_lists())
+         for cell in reader.read_list():
+            ai.player_fleet.hit(cell)
+      ship_id, sunk = reader.read(2)
+      ai.last_hit = (ship_id, sunk == 1)
+
+      # sink mode and faults
+      root, orientation, sink_max, sink_min, last_result = reader.read(5)
+      ai.sink_ship_root = root
+      if orientation is not None:
+         ai.sink_orientation = ORIENTATIONS[orientation]
+      ai.sink_max = sink_max
+      ai.sink_min = sink_min
+      ai.last_shot_result = last_result
+      ai.sink_hits = reader.read_list()
+      fault = reader.read()
+      if fault is not None:
+         ai.state_info = [FAULTS[fault], reader.read_list()]
+      return ai
+
+   '''
+   AI SEARCHING FUNCTIONS
+   '''
+   
+   @hot
+   def random_shot(self):
+      '''
+      Fires a shot randomly around the board, drawn from
+      the pool of fresh cells
+      '''
+      shot = self.unshot.choice(self.rng)
+      self.add_shot(shot)
+
+      # activates sink mode
+      if self.hit_needs_sinking():
+         self.sink_ship_root = shot
+         self.sink_hits.append(shot)
+         self.state = 1
+         
+      return shot
+   
+   def hit_needs_sinking(self):
+      '''
+      Checks if the last shot hit a ship longer than one cell,
+      which sink mode then tries to finish off
+      '''
+      ship_id = self.last_hit[0]
+      if ship_id is None:
+         return False
+      return len(self.player_fleet.ships[ship_id]) != 1
+
+   @hot
+   def sink_ship(self):
+      '''
+      When in sink mode, attempts to sink the located ship
+      as fast as possible by extending in a line
+      '''
+      # choose mode
+      if self.sink_orientation == None:
+         shot = self.sink_ship_orient()
+      else:
+         shot = self.sink_ship_extend()
+      self.add_shot(shot)
+      
+      # check sunk
+      ship_id, sunk = self.last_hit
+      if ship_id is not None:
+         self.sink_hits.append(shot)
+         
+      if sunk:
+         self.good_shots = self.good_shots + self.sink_hits
+         self.check_sink_fault(self.player_fleet.ships[ship_id])   # CHANGE THIS
+         self.sink_ship_reset()
+            
+      return shot
+   
+   def sink_ship_reset(self):
+      '''
+      When a ship has been sunk, resets the parameters of
+      sink ship in preparation for next search round
+      '''
+      self.sink_hits = []
+      self.sink_max = None
+      self.sink_min = None
+      self.sink_orientation = None
+      self.sink_ship_root = None
+      self.state = 0
+   
+   def sink_ship_extend(self):
+      '''
+      When in sink mode, this function is called to extend the line
+      after an orientation has been found
+      '''
+      possibilities = []
+      
+      # get lower bound
+      if self.sink_min == None:
+         if self.sink_orientation == 'v':   # vertical
+            lower_cell = min(self.sink_hits) - self.b_size
+         else:
+            lower_cell = min(self.sink_hits) - 1
+         if self.sink_check_valid(lower_cell):
+            possibilities.append(lower_cell)
+            
+      # get upper bound
+      if self.sink_max == None:
+         if self.sink_orientation == 'v':   # vertical
+            upper_cell = max(self.sink_hits) + self.b_size
+         else:
+            upper_cell = max(self.sink_hits) + 1
+         if self.sink_check_valid(upper_cell):
+            possibilities.append(upper_cell)
+            
+      # trigger error correction, hitting multiple ships
+      if not possibilities:
+         self.state = 2
+         self.state_info = ['EXTENSION',self.sink_hits]
+         return self.handle_faults()  # logic handled there
+         
+      cell = self.rng.choice(possibilities)
+            
+      # check if new limit hit
+      if self.player_fleet.ship_of(cell) is None:
+         if cell > self.sink_ship_root:
+            self.sink_max = cell
+         else:
+            self.sink_min = cell
+      return cell
+      
+   def sink_ship_orient(self):
+      '''
+      Attempts to find orientation of last hit ship
+      '''
+      possibilities = []
+      root = self.sink_ship_root
+      left,right = (root - 1), (root + 1)
+      up,down = (root - self.b_size), (root + self.b_size)
+      
+      # checks if valid
+      for pos in (left,right,up,down):
+         if self.sink_check_valid(pos):
+            possibilities.append(pos)
+            
+      # pick a possible cell, update orientation
+      cell = self.rng.choice(possibilities)
+      if self.player_fleet.ship_of(cell) is not None:   # if good hit
+         if cell == right or cell == left:
+            self.sink_orientation = 'h'
+         elif cell == up or cell == down:
+            self.sink_orientation = 'v'
+      
+      return cell
+      
+   def sink_check_valid(self,cell):
+      '''
+      Based on the position of the root, checks if
+      new possible firing positions are valid
+      '''
+      root = self.sink_ship_root
+      
+      # in board check
+      upper_lim = (self.b_size ** 2) - 1
+      if cell not in range(0,upper_lim):
+         return False
+      
+      # same row check
+      if self.num_to_matrix(root)[0] != self.num_to_matrix(cell)[0]:
+         if root == (cell + 1) or root == (cell - 1):
+            return False
+      
+      # existing shot check
+      if cell not in self.unshot:
+         return False
+      return True
+   
+   @hot
+   def adv_search(self):
+      '''
+      Statistically checks most likely positions for player's remaining ships
+      around the board and reduces as fast as possible
+      '''
+      ship_lengths = [len(x) for x in self.player_ships]
+      index = self.placement_index
+      if index is None or not index.set_lengths(ship_lengths):
+         index = PlacementIndex(self.b_size, ship_lengths, self.shots)
+         self.placement_index = index
+
+      # choose statistically best shot
+      possible = index.best_cells()
+      if possible:   # sorted, the index's order depends on how it was built
+         shot = self.rng.choice(sorted(possible.cells))
+         self.add_shot(shot)
+      else:
+         return self.random_shot()
+         
+      # activates sink mode
+      if self.hit_needs_sinking():
+         self.sink_ship_root = shot
+         self.sink_hits.append(shot)
+         self.state = 1
+         
+      return shot
+   
+   def check_sink_fault(self, ship_cells):
+      '''
+      Checks to make sure last player ship sunk matches the displayed
+      length of the ship. If not, must change search to make sure ship other ships
+      are sunk
+      '''
+      if len(self.sink_hits) != len(ship_cells):
+         self.state = 2
+         self.state_info = ['SINK_MISMATCH',None]
+   
+   '''
+   FAULT HANDLING - START
+   '''
+   def handle_faults(self):
+      '''
+      Called when AI is in stuck state, handles all logic for
+      finding ships until stuck state is resolved
+      Returns attempted solution
+      '''
+      fault_type = self.state_info[0]
+      if fault_type not in ('EXTENSION','SINK_MISMATCH'):
+         raise Exception('Error: That type of fault does not exist')
+      
+      fault_info = self.state_info[1]
+      
+      # call correct type of fault correction
+      if fault_type == 'EXTENSION':
+         return self.handle_extension_fault(fault_info)
+      elif fault_type == 'SINK_MISMATCH':
+         return self.handle_mismatch_fault(fault_info)
+      
+   def handle_extension_fault(self, info):
+      '''
+      Called when line has been extended to max in both directions
+      but ship has not been sunk. (hitting more than 1 ship)
+      '''
+      self.sink_ship_root
+      
+   def handle_mismatch_fault(self, info):
+      '''
+      Called when ship length of a sunk ship does not match the
+      length of good hits on the attempted ship (hit more than one ship
+      but only sunk one)
+      '''
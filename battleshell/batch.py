@@ -0,0 +1,406 @@
+'''
+BattleShell Game Batch V1.0
+
+Plays many games in lockstep on stacked NumPy arrays instead of one
+Game object each. Every step takes one shot per game from whoever's
+turn it is and resolves all of them in a few vectorized operations,
+with the same rules as Game.fire, Game.opponent_fire, check_sunk and
+check_game_over:
+   - a shot at an already shot cell is wasted but still counted
+   - a ship is sunk once every one of its cells is hit
+   - a side wins once every ship it shoots at is sunk
+   - the turn passes to the other side after every shot
+
+Side 0 is the player, shooting at the opponent's fleet, side 1 is the
+opponent, shooting at the player's fleet. verify() plays random shots
+through a batch and through scalar Games side by side.
+
+BatchWaveWatch picks the next shot of N boards in one call from an
+(N, b, b) board state, with the decision logic of WaveWatch.get_shot.
+play() drives a batch with one of them per side.
+
+Usage:
+   python -m battleshell.batch --games 2000 --b-size 10 --ships 5,4,3,3,2
+   python -m battleshell.batch --games 2000 --play --difficulty 3 --shooter-difficulty 3
+
+Author: Paul Belland
+'''
+
+import argparse
+import random
+import time
+from .bshell import Game, EMPTY, MISS, HIT
+from .ai import ADV_SEARCH_SEED, np_line_density
+from .placements import sample_fleets
+try:
+    import numpy as np
+except ImportError:   # GameBatch needs numpy, the rest of the engine does not
+    np = None
+
+NO_SHIP = -1
+NO_WINNER = -1
+SUNK = 4   # board state of a sunk ship's cells, beside the shot board values
+
+class GameBatch:
+    '''
+    N games of one board size and ship list as arrays, indexed by
+    game then side (the shooter):
+    - targets: (N, 2, cells) id of the ship on each cell shot at, -1 empty
+    - shots: (N, 2, cells) cells each side has shot
+    - remaining: (N, 2, ships) unhit cells left per ship shot at
+    - ships_left: (N, 2) ships left afloat per side's target
+    - turn, winner, shot_count, hit_count: per game (and side)
+    '''
+    def __init__(self, b_size, own_fleets, opp_fleets, turns):
+        if np is None:
+            raise Exception('Batch Error: GameBatch needs numpy installed')
+        if not len(own_fleets) == len(opp_fleets) == len(turns):
+            raise Exception('Batch Error: Every game needs both fleets and a turn')
+        games = len(turns)
+        ship_count = max(len(fleet) for fleet in list(own_fleets) + list(opp_fleets))
+        self.b_size = b_size
+        self.games = games
+        self.rows = np.arange(games)
+
+        self.targets = np.full((games, 2, b_size ** 2), NO_SHIP, dtype=np.int16)
+        self.lengths = np.zeros((games, 2, ship_count), dtype=np.int16)
+        for game in range(games):
+            # the player shoots at the opponent's fleet and vice versa
+            for side, fleet in ((0, opp_fleets[game]), (1, own_fleets[game])):
+                for ship_id, ship in enumerate(fleet):
+                    self.targets[game, side, ship] = ship_id
+                    self.lengths[game, side, ship_id] = len(ship)
+        self.remaining = self.lengths.copy()
+
+        self.shots = np.zeros((games, 2, b_size ** 2), dtype=bool)
+        self.ships_left = (self.remaining > 0).sum(axis=2).astype(np.int16)
+        self.turn = np.asarray(turns, dtype=np.int8).copy()
+        self.winner = np.full(games, NO_WINNER, dtype=np.int8)
+        self.shot_count = np.zeros((games, 2), dtype=np.int32)
+        self.hit_count = np.zeros((games, 2), dtype=np.int32)
+
+    @classmethod
+    def from_games(cls, games):
+        '''
+        Builds a batch from Games that finished placing their ships,
+        starting from the turn each one is on
+        '''
+        b_size = games[0].b_size
+        for game in games:
+            if game.b_size != b_size or game.opp_fleet is None:
+                raise Exception('Batch Error: Games need one board size and both fleets')
+        return cls(b_size, [game.own_fleet.ships for game in games],
+                   [game.opp_fleet.ships for game in games],
+                   [game.turn for game in games])
+
+    def active(self):
+        '''
+        Returns which games are still being played
+        '''
+        return self.winner == NO_WINNER
+
+    def board_state(self, side):
+        '''
+        Returns the (N, b, b) boards a side has shot at, with the shot
+        board values EMPTY, MISS and HIT, and SUNK for cells of sunk ships
+        '''
+        shots = self.shots[:, side]
+        ship = self.targets[:, side]
+        hit = shots & (ship != NO_SHIP)
+        left = np.take_along_axis(self.remaining[:, side], np.maximum(ship, 0), axis=1)
+
+        state = np.full(shots.shape, EMPTY, dtype=np.int8)
+        state[shots] = MISS
+        state[hit] = HIT
+        state[hit & (left == 0)] = SUNK
+        return state.reshape(self.games, self.b_size, self.b_size)
+
+    def lengths_left(self, side):
+        '''
+        Returns an (N, b_size + 1) count of the ships left afloat of
+        each length, in the fleets a side shoots at
+        '''
+        counts = np.zeros((self.games, self.b_size + 1), dtype=np.int16)
+        afloat = (self.remaining[:, side] > 0).astype(np.int16)
+        np.add.at(counts, (self.rows[:, None], self.lengths[:, side]), afloat)
+        counts[:, 0] = 0   # unused ship slots
+        return counts
+
+    def fire(self, cells):
+        '''
+        Fires one shot per game, from the side whose turn it is. Shots
+        for finished games are ignored. Returns boolean arrays of the
+        games whose shot hit, missed (wasted shots included), sunk a
+        ship, and the games that are over after it
+        '''
+        cells = np.asarray(cells)
+        rows = self.rows
+        active = self.active()
+        side = self.turn.astype(np.intp)
+
+        # wasted shots are counted but change nothing else
+        fresh = active & ~self.shots[rows, side, cells]
+        self.shots[rows[fresh], side[fresh], cells[fresh]] = True
+        self.shot_count[rows[active], side[active]] += 1
+
+        # hits take a cell off the ship they struck
+        ship = self.targets[rows, side, cells]
+        hit = fresh & (ship != NO_SHIP)
+        hit_rows, hit_sides, hit_ships = rows[hit], side[hit], ship[hit]
+        self.hit_count[hit_rows, hit_sides] += 1
+        self.remaining[hit_rows, hit_sides, hit_ships] -= 1
+
+        # sinks and wins
+        sunk = np.zeros(self.games, dtype=bool)
+        sunk[hit_rows] = self.remaining[hit_rows, hit_sides, hit_ships] == 0
+        self.ships_left[rows[sunk], side[sunk]] -= 1
+        won = sunk & (self.ships_left[rows, side] == 0)
+        self.winner[won] = side[won]
+
+        # turn passes on in games still running after the shot
+        self.turn[active] ^= 1
+        return hit, active & ~hit, sunk, ~self.active()
+
+class BatchWaveWatch:
+    '''
+    WaveWatch for N boards at once. Reads each board's state instead of
+    keeping a sink mode per game, a board is sinking while it holds
+    hits on a ship that is not sunk yet:
+    - difficulty 1 shoots a random unshot cell
+    - difficulty 2 sinks around open hits, otherwise shoots randomly
+    - difficulty 3 sinks the same way, otherwise takes its few random
+      shots then the densest cell for the ships left
+    A sink extends a line of two or more open hits from its ends, or
+    tries around a single hit. Boards with open hits but no cell left
+    to try around them fall back to searching
+    '''
+    def __init__(self, difficulty, b_size, games, seed=None):
+        if np is None:
+            raise Exception('Batch Error: BatchWaveWatch needs numpy installed')
+        self.difficulty = difficulty
+        self.b_size = b_size
+        self.rng = np.random.default_rng(seed)
+        self.adv_seed = self.rng.integers(0, ADV_SEARCH_SEED + 1, games)
+
+    def get_shots(self, state, lengths_left, playing=None):
+        '''
+        Returns the next shot of every board. state is the (N, b, b)
+        board state from GameBatch.board_state, lengths_left the ships
+        left per length. Only boards in playing shoot, the cells
+        returned for the rest are meaningless
+        '''
+        shots = np.zeros(len(state), dtype=np.intp)
+        if playing is None:
+            playing = np.ones(len(state), dtype=bool)
+        state, lengths_left = state[playing], lengths_left[playing]
+        unshot = (state == EMPTY).reshape(len(state), -1)
+        chosen = self.pick(unshot)
+        if self.difficulty == 1:
+            shots[playing] = chosen
+            return shots
+
+        # sinking boards
+        targets = self.sink_targets(state)
+        sinking = targets.any(axis=1)
+        chosen[sinking] = self.pick(targets[sinking])
+
+        # searching boards, difficulty 3 uses the heatmap after its random shots
+        if self.difficulty == 3:
+            seeds = self.adv_seed[playing]
+            searching = ~sinking
+            random_search = searching & (seeds > 0)
+            seeds[random_search] -= 1
+            self.adv_seed[playing] = seeds
+            dense = searching & ~random_search
+            if dense.any():
+                best = self.best_cells(state[dense], lengths_left[dense])
+                chosen[dense] = self.pick(best, chosen[dense])
+        shots[playing] = chosen
+        return shots
+
+    def pick(self, cells, fallback=None):
+        '''
+        Picks one random True cell per row of an (N, cells) mask. Rows
+        without any take their fallback
+        '''
+        keys = np.where(cells, self.rng.random(cells.shape), -1.0)
+        chosen = keys.argmax(axis=1)
+        if fallback is not None:
+            chosen = np.where(cells.any(axis=1), chosen, fallback)
+        return chosen
+
+    def sink_targets(self, state):
+        '''
+        Returns the (N, cells) unshot cells worth trying to sink the
+        open hits of each board, none for boards not sinking
+        '''
+        open_hits = state == HIT
+        unshot = state == EMPTY
+
+        # lines of two or more open hits, extended from both ends
+        line = np.zeros_like(unshot)
+        for axis in (1, 2):
+            pairs = open_hits & (shift(open_hits, axis, 1) | shift(open_hits, axis, -1))
+            line |= unshot & (shift(pairs, axis, 1) | shift(pairs, axis, -1))
+
+        # single hits try all around
+        around = np.zeros_like(unshot)
+        for axis in (1, 2):
+            around |= unshot & (shift(open_hits, axis, 1) | shift(open_hits, axis, -1))
+        has_line = line.any(axis=(1, 2))
+        targets = np.where(has_line[:, None, None], line, around)
+        return targets.reshape(len(state), -1)
+
+    def best_cells(self, state, lengths_left):
+        '''
+        Returns the (N, cells) cells tied for the highest count of
+        placements of the ships left, none for boards where no ship fits
+        '''
+        games, b_size = len(state), self.b_size
+        blocked = (state != EMPTY).astype(np.int32)
+        rows = blocked.reshape(games * b_size, b_size)
+        cols = blocked.transpose(0, 2, 1).reshape(games * b_size, b_size)
+
+        # every board's rows and columns go through np_line_density together
+        heat = np.zeros((games, b_size, b_size), dtype=np.int32)
+        for length in range(1, b_size + 1):
+            count = lengths_left[:, length]
+            if not count.any():
+                continue
+            lines = np_line_density(rows, length).reshape(games, b_size, b_size)
+            lines += np_line_density(cols, length).reshape(games, b_size, b_size).transpose(0, 2, 1)
+            heat += count[:, None, None] * lines
+        heat = heat.reshape(games, -1)
+        top = heat.max(axis=1)[:, None]
+        return (heat == top) & (top > 0)
+
+def shift(mask, axis, step):
+    '''
+    Shifts a stack of boards one cell along an axis without wrapping,
+    so a cell lines up with its neighbour
+    '''
+    moved = np.zeros_like(mask)
+    source = [slice(None)] * 3
+    target = [slice(None)] * 3
+    if step > 0:
+        source[axis], target[axis] = slice(None, -1), slice(1, None)
+    else:
+        source[axis], target[axis] = slice(1, None), slice(None, -1)
+    moved[tuple(target)] = mask[tuple(source)]
+    return moved
+
+def placed_games(games, b_size, ship_list, rng):
+    '''
+    Returns scalar Games against the AI with every ship randomly
+    placed and a random starter, ready to shoot
+    '''
+    scalar = []
+    for i in range(games):
+        game = Game(0, b_size, list(ship_list), seed=rng)
+        game.set_starter(rng.randint(0, 1))
+        game.start_game()
+        while game.get_phase() in (0, 1):
+            game.start_place_ship()
+            game.place_ship()
+        scalar.append(game)
+    return scalar
+
+def play(games=1000, b_size=10, ship_list=(5, 4, 3, 3, 2), difficulty=3, shooter_diff=3, seed=0):
+    '''
+    Plays a batch of games to the end with a BatchWaveWatch per side,
+    shooter_diff for the player and difficulty for the opponent.
+    Returns the finished GameBatch
+    '''
+    rng = random.Random(seed)
+    ship_list = list(ship_list)
+    fleets = sample_fleets(b_size, ship_list, games * 2, rng)
+    turns = [rng.randint(0, 1) for i in range(games)]
+    batch = GameBatch(b_size, fleets[:games], fleets[games:], turns)
+    bots = (BatchWaveWatch(shooter_diff, b_size, games, seed),
+            BatchWaveWatch(difficulty, b_size, games, seed + 1))
+    cells = np.zeros(games, dtype=np.intp)
+    while batch.active().any():
+        for side, bot in enumerate(bots):
+            playing = batch.active() & (batch.turn == side)
+            if playing.any():
+                shots = bot.get_shots(batch.board_state(side), batch.lengths_left(side), playing)
+                cells[playing] = shots[playing]
+        batch.fire(cells)
+    return batch
+
+def verify(games=200, b_size=10, ship_list=(5, 4, 3, 3, 2), seed=0):
+    '''
+    Plays the same random shots through a GameBatch and through
+    scalar Games, raises on the first result that differs. Returns
+    the number of shots compared
+    '''
+    scalar = placed_games(games, b_size, ship_list, random.Random(seed))
+    batch = GameBatch.from_games(scalar)
+
+    # random cells, so wasted shots on shot cells get checked too
+    cell_rng = np.random.default_rng(seed)
+    compared = 0
+    while batch.active().any():
+        cells = cell_rng.integers(0, b_size ** 2, games)
+        shooters = batch.turn.copy()
+        hit, miss, sunk, over = batch.fire(cells)
+        for index, game in enumerate(scalar):
+            if game.get_phase() == 3:
+                if hit[index] or miss[index]:
+                    raise Exception(f'Batch Error: Game {index} fired after it ended')
+                continue
+            if shooters[index] == 0:
+                hits = game.hit_count
+                result = game.fire(int(cells[index]))
+                was_hit = game.hit_count > hits
+                was_sunk = result.startswith('You sunk')
+            else:
+                hits = game.opp_hit_count
+                result = game.opponent_fire(int(cells[index]))
+                was_hit = game.opp_hit_count > hits
+                was_sunk = result.startswith('Your ship was sunk')
+            ended = game.check_game_over() != False
+            expected = (was_hit, not was_hit, was_sunk, ended, game.get_turn())
+            found = (hit[index], miss[index], sunk[index], over[index], batch.turn[index])
+            if tuple(bool(value) for value in expected[:4]) + expected[4:] != \
+               tuple(bool(value) for value in found[:4]) + (int(found[4]),):
+                raise Exception(f'Batch Error: Game {index} differs, expected {expected} got {found}')
+            compared += 1
+
+    # final statistics
+    for index, game in enumerate(scalar):
+        stats = (game.shot_count, game.hit_count, game.opp_shot_count, game.opp_hit_count)
+        found = (batch.shot_count[index, 0], batch.hit_count[index, 0],
+                 batch.shot_count[index, 1], batch.hit_count[index, 1])
+        if stats != tuple(int(value) for value in found):
+            raise Exception(f'Batch Error: Game {index} statistics differ')
+    return compared
+
+def main():
+    parser = argparse.ArgumentParser(description='Check GameBatch against the scalar Game')
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--b-size', type=int, default=10)
+    parser.add_argument('--ships', default='5,4,3,3,2', help='comma separated ship lengths')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--play', action='store_true', help='play BatchWaveWatch games instead')
+    parser.add_argument('--difficulty', type=int, default=3, choices=(1, 2, 3))
+    parser.add_argument('--shooter-difficulty', type=int, default=3, choices=(1, 2, 3))
+    args = parser.parse_args()
+
+    ship_list = [int(ship) for ship in args.ships.split(',')]
+    if not args.play:
+        compared = verify(args.games, args.b_size, ship_list, args.seed)
+        print(f'{args.games} games, {compared} shots matched the scalar Game')
+        return
+
+    start = time.perf_counter()
+    batch = play(args.games, args.b_size, ship_list, args.difficulty, args.shooter_difficulty, args.seed)
+    took = time.perf_counter() - start
+    turns = int(batch.shot_count.sum())
+    wins = (batch.winner == 0).mean() * 100
+    print(f'{args.games} games, {turns} AI turns in {took:.2f}s ({turns / took:.0f} turns/s)')
+    print(f'player win {wins:.1f}%, avg shots {batch.shot_count[:, 0].mean():.1f} player, '
+          f'{batch.shot_count[:, 1].mean():.1f} opponent')
+
+if __name__ == '__main__':
+    main()
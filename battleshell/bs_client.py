@@ -9,13 +9,17 @@ Author: Paul Belland
 '''
 
 import socket
-import pickle
+from .bs_protocol import Listener, MessageBuffer, frame, receive
+from .perf import hot, instrumented
 
 PORT = 5001
 
+@instrumented
 class Client:
     def __init__(self,name):
         self.name = name   # players username
+        self.buffer = MessageBuffer()
+        self.listener = None
     
     def run(self):
         '''
@@ -24,40 +28,43 @@ class Client:
         try:
             self.host = socket.gethostname()  # as both code is running on same pc
             self.client_sock = socket.socket()  # instantiate
-            self.client_sock.connect((self.host, PORT))  # connect to the server
-            self.client_sock.setblocking(0)
+            self.client_sock.connect((self.host, PORT))  # connect to the server, left blocking for sendall
             return 'Connected to host!'
         except:
             return 'No host could be found'
 
+    def listen(self, notify):
+        '''
+        Starts a background thread that reads packets from the host as
+        soon as they arrive, calling notify each time
+        '''
+        self.listener = Listener(notify)
+        self.listener.watch_messages(self.client_sock, self.buffer)
+        self.listener.start()
+
+    @hot
     def refresh(self):
         '''
         When called, receives any packets passed from host
-        Returns:
+        Returns a list with, for every complete message:
         - Identifier tag (helps identify what to do with info)
         - Data associated with identifier tag (ie List or String)
         '''
-        try:
-            raw_data = self.client_sock.recv(1024)
-            
-            if raw_data:
-                payload = pickle.loads(raw_data)
-                identifier, data = payload[0], payload[1]
-                return identifier, data
-            else:
-                return 'Status', 'Disconnected'
-        except BlockingIOError:
-            return None, None
+        if self.listener:
+            return self.listener.drain()
+        return receive(self.client_sock, self.buffer)
             
+    @hot
     def send(self,identifier,data=None):
         '''
         Sends any given data to host
         '''
-        payload = pickle.dumps([identifier,data])
-        self.client_sock.send(payload)
+        self.client_sock.sendall(frame(identifier, data))
         
     def close(self):
         '''
         Kills the client connection to host
         '''
+        if self.listener:
+            self.listener.stop()
         self.client_sock.close()
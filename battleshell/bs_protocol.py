@@ -0,0 +1,266 @@
+'''
+BattleShell Protocol V2.0
+
+Message framing shared by the BattleShell server and client. Every message
+is sent as a 4 byte big-endian length followed by its payload, and received
+bytes are kept in a buffer until whole messages are available. This way
+large payloads and bursts of messages arrive intact.
+
+Payloads use a small fixed codec instead of pickle, so nothing received is
+ever executed. Each payload starts with a protocol version byte and a
+message type byte:
+   - Name, B_SIZE, SHOT, NOTIF, Status: UTF-8 text
+   - RESIGN: one unsigned byte
+   - GAME_INFO: starter byte (255 for None), ship count byte, a length
+     byte per ship, then every ship cell as a 16 bit unsigned int
+Peers on another protocol version are dropped with an Incompatible status.
+
+A Listener thread can wait on the sockets instead of polling them, so
+messages are handed over as soon as they arrive.
+
+Author: Paul Belland
+'''
+
+import queue
+import select
+import selectors
+import socket
+import struct
+import threading
+
+HEADER = struct.Struct('!I')   # payload length
+RECV_SIZE = 4096
+MAX_MESSAGE = 1024 * 1024
+DISCONNECTED = ('Status', 'Disconnected')
+INCOMPATIBLE = ('Status', 'Incompatible')
+
+### MESSAGE CODEC ###
+VERSION = 2   # 1 was the pickle protocol
+MESSAGE_HEADER = struct.Struct('!BB')   # version, message type
+SHIPS_HEADER = struct.Struct('!BB')   # starter, ship count
+NUMBER = struct.Struct('!B')
+NO_STARTER = 255
+
+TEXT, BYTE, SHIPS = range(3)   # payload kinds
+MESSAGES = {
+    'Name': (1, TEXT),
+    'B_SIZE': (2, TEXT),
+    'GAME_INFO': (3, SHIPS),
+    'SHOT': (4, TEXT),
+    'NOTIF': (5, TEXT),
+    'RESIGN': (6, BYTE),
+    'Status': (7, TEXT),
+}
+CODES = {code: (identifier, kind) for identifier, (code, kind) in MESSAGES.items()}
+
+def encode(identifier, data=None):
+    '''
+    Encodes a message into its payload bytes
+    '''
+    if identifier not in MESSAGES:
+        raise Exception(f'Protocol Error: Unknown message {identifier}')
+    code, kind = MESSAGES[identifier]
+    header = MESSAGE_HEADER.pack(VERSION, code)
+
+    if kind == TEXT:
+        return header + str(data).encode('utf-8')
+    if kind == BYTE:
+        return header + NUMBER.pack(data)
+
+    # ship layout and starter
+    ships, starter = data
+    if starter is None:
+        starter = NO_STARTER
+    lengths = [len(ship) for ship in ships]
+    cells = [cell for ship in ships for cell in ship]
+    layout = struct.pack(f'!{len(lengths)}B{len(cells)}H', *lengths, *cells)
+    return header + SHIPS_HEADER.pack(starter, len(ships)) + layout
+
+def decode(payload):
+    '''
+    Decodes payload bytes back into (identifier, data)
+    '''
+    if len(payload) < MESSAGE_HEADER.size:
+        raise Exception('Protocol Error: Message too short')
+    version, code = MESSAGE_HEADER.unpack_from(payload)
+    if version != VERSION:
+        raise Exception(f'Protocol Error: Unsupported version {version}')
+    if code not in CODES:
+        raise Exception(f'Protocol Error: Unknown message type {code}')
+    identifier, kind = CODES[code]
+    offset = MESSAGE_HEADER.size
+
+    if kind == TEXT:
+        return identifier, payload[offset:].decode('utf-8')
+    if kind == BYTE:
+        return identifier, NUMBER.unpack_from(payload, offset)[0]
+
+    # ship layout and starter
+    if len(payload) < offset + SHIPS_HEADER.size:
+        raise Exception('Protocol Error: Ship layout too short')
+    starter, count = SHIPS_HEADER.unpack_from(payload, offset)
+    offset += SHIPS_HEADER.size
+    lengths = payload[offset:offset + count]
+    if len(lengths) != count or len(payload) - offset - count != 2 * sum(lengths):
+        raise Exception('Protocol Error: Ship lengths do not match the cells sent')
+    cells = struct.unpack_from(f'!{sum(lengths)}H', payload, offset + count)
+    ships = []
+    start = 0
+    for length in lengths:
+        ships.append(list(cells[start:start + length]))
+        start += length
+    if starter == NO_STARTER:
+        starter = None
+    return identifier, (ships, starter)
+
+def frame(identifier, data=None):
+    '''
+    Returns the length-prefixed bytes to send for a message
+    '''
+    payload = encode(identifier, data)
+    return HEADER.pack(len(payload)) + payload
+
+class MessageBuffer:
+    def __init__(self):
+        self.buffer = bytearray()
+        self.broken = False   # a message could not be read, the rest is dropped
+
+    def feed(self, raw_data):
+        '''
+        Adds received bytes to the end of the buffer
+        '''
+        self.buffer.extend(raw_data)
+
+    def messages(self):
+        '''
+        Removes and returns every complete message in the buffer,
+        a partial message stays until the rest of it arrives. Stops at
+        a message that cannot be read, keeping the ones before it, and
+        sets broken since nothing after it can be framed
+        '''
+        messages = []
+        if self.broken:
+            self.buffer.clear()
+            return messages
+        start = 0
+        try:
+            while len(self.buffer) - start >= HEADER.size:
+                length = HEADER.unpack_from(self.buffer, start)[0]
+                if length > MAX_MESSAGE:
+                    raise Exception('Protocol Error: Message too large')
+                end = start + HEADER.size + length
+                if end > len(self.buffer):
+                    break
+                messages.append(decode(bytes(self.buffer[start + HEADER.size:end])))
+                start = end
+        except Exception:   # old or foreign client
+            self.broken = True
+            start = len(self.buffer)
+        del self.buffer[:start]
+        return messages
+
+def receive(sock, buffer):
+    '''
+    Reads everything already arrived on a socket into the buffer, without
+    waiting for more. Sockets stay blocking so sendall always writes a
+    whole message. Returns all complete messages, ending with a
+    disconnected status if the other side closed the connection, or an
+    incompatible status if it sent something this protocol cannot read
+    '''
+    closed = False
+    try:
+        while select.select([sock], [], [], 0)[0]:
+            raw_data = sock.recv(RECV_SIZE)
+            if not raw_data:
+                closed = True
+                break
+            buffer.feed(raw_data)
+    except ConnectionError:
+        closed = True
+
+    messages = buffer.messages()
+    if buffer.broken:   # the good messages before it are still handed over
+        messages.append(INCOMPATIBLE)
+    elif closed:
+        messages.append(DISCONNECTED)
+    return messages
+
+class Listener(threading.Thread):
+    '''
+    Background thread waiting on sockets with a selector. Received messages
+    are put in a thread-safe queue and notify is called straight away from
+    this thread, so it must only schedule work (ie. Clock.schedule_once)
+    '''
+    def __init__(self, notify):
+        threading.Thread.__init__(self, daemon=True)
+        self.notify = notify
+        self.messages = queue.Queue()
+        self.selector = selectors.DefaultSelector()
+        self.running = True
+
+        # lets stop() wake the thread up from select
+        self.waker, self.wake_sock = socket.socketpair()
+        self.selector.register(self.waker, selectors.EVENT_READ, None)
+
+    def watch(self, sock, handler):
+        '''
+        Calls handler in the listener thread whenever sock is readable
+        '''
+        self.selector.register(sock, selectors.EVENT_READ, handler)
+
+    def forget(self, sock):
+        '''
+        Stops watching a socket
+        '''
+        self.selector.unregister(sock)
+
+    def watch_messages(self, sock, buffer):
+        '''
+        Reads and posts the messages of a connected socket as they arrive
+        '''
+        def read():
+            messages = receive(sock, buffer)
+            if DISCONNECTED in messages or INCOMPATIBLE in messages:
+                self.forget(sock)
+            self.post(messages)
+        self.watch(sock, read)
+
+    def post(self, messages):
+        '''
+        Queues messages for the main thread and notifies it
+        '''
+        for message in messages:
+            self.messages.put(message)
+        if messages:
+            self.notify()
+
+    def drain(self):
+        '''
+        Returns every queued message, called from the main thread
+        '''
+        messages = []
+        while True:
+            try:
+                messages.append(self.messages.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def run(self):
+        while self.running:
+            for key, events in self.selector.select():
+                if key.data is not None and self.running:
+                    key.data()
+        self.selector.close()
+        self.waker.close()
+        self.wake_sock.close()
+
+    def stop(self):
+        '''
+        Stops the thread, sockets can be closed once it returns
+        '''
+        if not self.running:
+            return
+        self.running = False
+        self.wake_sock.send(b'\0')
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(1)
@@ -9,13 +9,17 @@ Author: Paul Belland
 '''
 
 import socket
-import pickle
+from .bs_protocol import Listener, MessageBuffer, frame, receive
+from .perf import hot, instrumented
 
 PORT = 5001
 
+@instrumented
 class Server:
     def __init__(self,name):
         self.name = name
+        self.buffer = MessageBuffer()
+        self.listener = None
     
     def run(self):
         '''
@@ -32,42 +36,57 @@ class Server:
         except:
             return 'Server already running!'
         
+    @hot
     def search(self):
         '''
         When called, tries to accept any incoming connections from other clients
         '''
         try:
             self.conn, self.address = self.server.accept()  # accept new connection
-            self.conn.setblocking(0)
+            self.conn.setblocking(1)   # sendall must never stop part way
             self.send('Name',self.name)
             return 'Connected to opponent!'
         except:
             return False
+
+    def listen(self, notify):
+        '''
+        Starts a background thread that accepts the opponent and reads
+        its packets as soon as they arrive, calling notify each time.
+        The connection shows up as a ('Status', 'Connected') packet
+        '''
+        self.listener = Listener(notify)
+        self.listener.watch(self.server, self.accept)
+        self.listener.start()
+
+    def accept(self):
+        '''
+        Called from the listener when a client is waiting to connect
+        '''
+        if self.search():
+            self.listener.forget(self.server)
+            self.listener.watch_messages(self.conn, self.buffer)
+            self.listener.post([('Status', 'Connected')])
     
+    @hot
     def refresh(self):
         '''
-        When called, receives any packets passed from opponent
+        When called, receives any packets passed from opponent.
+        Returns a list of (identifier, data) for every complete message
         '''
-        try:
-            conn = self.conn
-            raw_data = conn.recv(1024)
-            
-            if raw_data:
-                payload = pickle.loads(raw_data)
-                identifier, data = payload[0], payload[1]
-                return identifier, data
-            else:
-                return 'Status', 'Disconnected'
-        except BlockingIOError:
-            return None, None
+        if self.listener:
+            return self.listener.drain()
+        return receive(self.conn, self.buffer)
             
+    @hot
     def send(self,identifier,data=None):
         '''
         Sends any given data to opponent's client
         '''
-        payload = pickle.dumps([identifier,data])
-        self.conn.send(payload)
+        self.conn.sendall(frame(identifier, data))
         
     def close(self):
         '''Kills the server'''
+        if self.listener:
+            self.listener.stop()
         self.server.close()
@@ -12,12 +12,16 @@ Author: Paul Belland
 '''
 
 ### BASIC SETUP ###
-from ai import *
+from .placements import sample_fleet
+from .fleet import Fleet
+from .snapshot import CORRUPT_ERRORS, SnapshotReader, SnapshotWriter
+from .perf import hot, instrumented
+from array import array
 import random
-from collections import Counter
 ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
 OOB_MSG = 'Out of bounds!'
 VERSION = 1.8
+SNAPSHOT_MAGIC = b'BSG'
 
 ### CELL VALUES ###
 EMPTY = 0
@@ -26,8 +30,34 @@ HIT = 2
 PLACING = 3
 FRIENDLY = 5
 
+### BOARD CHOICES ###
+OWN_BOARD = 0
+SHOT_BOARD = 1
+
+### BITBOARD HELPERS ###
+def cells_to_mask(cells):
+    '''
+    Packs a list of cells into a bitboard int, one bit per cell
+    '''
+    mask = 0
+    for cell in cells:
+        mask |= 1 << cell
+    return mask
+
+def mask_to_cells(mask):
+    '''
+    Unpacks a bitboard int back into an ascending list of cells
+    '''
+    cells = []
+    while mask:
+        low = mask & -mask
+        cells.append(low.bit_length() - 1)
+        mask ^= low
+    return cells
+
+@instrumented
 class Game:
-    def __init__(self,opp,b_size,ship_list,ai_diff=1) -> None:
+    def __init__(self,opp,b_size,ship_list,ai_diff=1,bitboard=False,seed=None) -> None:
         # MAIN GAME SETTINGS
         self.ship_sizes = []
         self.ships_to_place = 0
@@ -35,6 +65,14 @@ class Game:
         self.opponent = opp   # 0 AI, 1 MULTIPLAYER
         self.b_size = b_size   # 2-26
         self.ai_diff = ai_diff   # 1-3
+        self.bitboard = bitboard   # cell groups stored as ints, boards built on demand
+        # every random draw of the game and its AI, the random module without a seed
+        if seed is None or seed is random:
+            self.rng = random
+        elif isinstance(seed, random.Random):
+            self.rng = seed
+        else:
+            self.rng = random.Random(seed)
         for ship in ship_list:
             self.ship_sizes.append(ship)
             self.ships_to_place += 1
@@ -45,16 +83,21 @@ class Game:
         self.turn = 1  # 0 is player, 1 is opponent
         self.own_board = None
         self.shot_board = None
-        self.player_cells = []
+        self.changed = [0, 0]   # per board: bitmask of cells changed since last taken
+        self.player_cells = self.new_cell_group()
         self.last_placement = []
+        self.placement_drawn = False   # if last_placement is on the board
         self.individual_locations = []
-        self.player_shots = []
+        self.own_fleet = Fleet()   # cell -> ship index of the player's ships
+        self.player_shots = self.new_cell_group()
+        self.revealed = False
         
         # OPPONENT SETUP
         self.ai = None
         self.opp_ship_cells = None
         self.opp_indiv_ships = None
-        self.opp_shots = []
+        self.opp_fleet = None
+        self.opp_shots = self.new_cell_group()
         if opp == 0:
             self.opp_name = 'The AI'
         else:
@@ -65,6 +108,7 @@ class Game:
         self.hit_count = 0
         self.opp_shot_count = 0
         self.opp_hit_count = 0
+        self.moves = array('H')   # every shot as cell * 2 + shooter, 0 player, 1 opponent
 
     ### REGULAR METHODS ###
     def verify_settings(self,opp,b_size,ship_list,ai_diff):
@@ -95,7 +139,7 @@ class Game:
         
         if max(ship_list) > (b_size - 1):
             raise Exception(f'Game Error: At least one ship is too long')
-            
+
         if len(ship_list) > b_size:   # checks for total ships
             raise Exception('Game Error: Too many ships for this board size')
         
@@ -103,8 +147,9 @@ class Game:
         '''
         Starts the game and needed portions
         '''
-        # starts game
-        self.build_matrix()
+        # starts game, bitboard mode renders its boards on demand
+        if not self.bitboard:
+            self.build_matrix()
         
         # checks if starter set
         if self.starter == None:
@@ -119,22 +164,44 @@ class Game:
         else:
             return 'Waiting for opponent!'
         
-    def update_board(self,board,cells,cell_type):
+    @hot
+    def update_board(self,choice,cells,cell_type):
         '''
-        Updates the given board with cells of a certain type
+        Updates the given board (0 own, 1 shots) with cells of a
+        certain type and logs them as changed
         '''
+        self.mark_changed(choice, cells)
+        if self.bitboard:   # boards are rendered on demand
+            return
+        board = self.get_boards(choice)
         for cell in cells:
             row,col = self.num_to_matrix(cell)
             board[row][col] = cell_type
 
+    def mark_changed(self, choice, cells):
+        '''
+        Logs cells of a board (0 own, 1 shots) as changed
+        '''
+        self.changed[choice] |= cells_to_mask(cells)
+
+    @hot
+    def get_changes(self, choice):
+        '''
+        Returns the cells of a board (0 own, 1 shots) changed since the
+        last call and clears them, so a redraw costs only those cells
+        '''
+        changed = self.changed[choice]
+        self.changed[choice] = 0
+        return mask_to_cells(changed)
+
     def get_curr_board(self):
         '''
         Returns the board corresponding to the current turn
         Player (shot board), AI (player board)
         '''
         if self.turn == 0:
-            return self.shot_board
-        return self.own_board
+            return self.get_boards(1)
+        return self.get_boards(0)
     
     def set_opponent_shot(self, shot):
         '''
@@ -159,12 +226,13 @@ class Game:
         self.verify_ships(check_list, self.b_size)   # check if valid
         
         self.opp_indiv_ships = []
-        self.opp_ship_cells = []
+        self.opp_ship_cells = self.new_cell_group()
         for ship in ship_list:
             self.opp_indiv_ships.append(ship)
-            for cell in ship:
-                self.opp_ship_cells.append(cell)
+            self.opp_ship_cells = self.add_cells(self.opp_ship_cells, ship)
+        self.opp_fleet = Fleet(ship_list)
     
+    @hot
     def get_ai_shot(self):
         '''
         Returns cell chosen by the AI based on current game settings
@@ -180,24 +248,26 @@ class Game:
         shot = self.ai.get_shot()
         return self.opponent_fire(shot)   # shoots
         
+    @hot
     def opponent_fire(self, cell):
         '''
         Given a cell, checks if the opponents shot is a hit or miss,
         then updates the board and statistics
         '''
         self.opp_shot_count = self.opp_shot_count + 1   # updates stats
+        self.moves.append(cell * 2 + 1)
         
         # already shot
-        if cell in self.opp_shots:
+        if self.has_cell(self.opp_shots, cell):
             self.turn = 0
             return 'Your opponent wasted a turn!'
-        self.opp_shots.append(cell)
+        self.opp_shots = self.add_cells(self.opp_shots, [cell])
         
         # hit case
-        if cell in self.player_cells:
+        if self.has_cell(self.player_cells, cell):
             self.opp_hit_count = self.opp_hit_count + 1   # updates stats
-            self.update_board(self.own_board,[cell],HIT)
-            was_sunk = self.check_sunk()
+            self.update_board(OWN_BOARD,[cell],HIT)
+            was_sunk = self.check_sunk(cell)
             if was_sunk != False:
                 result = was_sunk
             else:
@@ -205,29 +275,45 @@ class Game:
                 
         # miss case
         else:
-            self.update_board(self.own_board,[cell],MISS)
+            self.update_board(OWN_BOARD,[cell],MISS)
             result = f'{self.opp_name} missed!'
         self.turn = 0
         return result 
     
-    def check_sunk(self):
+    @hot
+    def check_sunk(self, cell=None):
         '''
         Checks if any ship was sunk when called, must be called
         after a player has shot but still in the same turn.
+        Given the hit cell, resolves the ship through the fleet index,
+        otherwise checks each ship against every shot
         '''
         # determines last shooter info
         if self.turn == 0:   # player
             ships = self.opp_indiv_ships
             shots = self.player_shots
+            fleet = self.opp_fleet
         else:  # opponent
             ships = self.individual_locations
             shots = self.opp_shots
-            
-        # checks each individual ship
+            fleet = self.own_fleet
+
+        # looks up the hit ship
         index = None
-        for i in range(len(ships)):
-            if set(ships[i]).issubset(set(shots)):   # checks if all cells are hit
-                index = i
+        if cell is not None:
+            ship_id, sunk = fleet.hit(cell)
+            if sunk:
+                index = ships.index(fleet.ships[ship_id])
+
+        # checks each individual ship
+        else:
+            for i in range(len(ships)):
+                if self.bitboard:   # all bits of the ship set in the shots
+                    ship_mask = cells_to_mask(ships[i])
+                    if shots & ship_mask == ship_mask:
+                        index = i
+                elif set(ships[i]).issubset(set(shots)):   # checks if all cells are hit
+                    index = i
         
         # removal and announce
         if index != None:
@@ -237,6 +323,7 @@ class Game:
             return f'Your ship was sunk! ({sunk_len})'
         return False
     
+    @hot
     def check_game_over(self):
         '''
         Checks if anyone won the game off of the last move
@@ -256,12 +343,18 @@ class Game:
     
     def start_ai(self):
         '''
-        Starts AI with all needed game info
+        Starts AI with all needed game info, the AI module is
+        only imported once a game against it starts
         '''
+        from .ai import WaveWatch
         try:
-            self.ai = WaveWatch(self.ai_diff,self.b_size,self.ship_sizes)
+            self.ai = WaveWatch(self.ai_diff,self.b_size,self.ship_sizes,self.rng)
             self.ai.start()
-            self.opp_ship_cells, self.opp_indiv_ships = self.ai.get_ai_ships()
+            ai_cells, self.opp_indiv_ships = self.ai.get_ai_ships()
+            self.opp_fleet = Fleet(self.opp_indiv_ships)
+            if self.bitboard:
+                ai_cells = cells_to_mask(ai_cells)
+            self.opp_ship_cells = ai_cells
         except:
             raise Exception('Game Error: AI object failed to start')
         
@@ -299,10 +392,15 @@ class Game:
             raise Exception('Game Error: Tried setting illegal starter (not in 0,1)')
         self.starter = starter
     
+    @hot
     def get_boards(self, choice=2):
         '''
         Returns both boards
         '''
+        if self.bitboard:
+            if choice == 2:
+                return self.render_board(0), self.render_board(1)
+            return self.render_board(choice)
         if choice == 2:   # if no argument, return both
             return self.own_board, self.shot_board
         elif choice == 1:   # return shot board
@@ -324,6 +422,67 @@ class Game:
                 self.own_board = matrix
             else:
                 self.shot_board = matrix
+
+    def render_board(self, choice):
+        '''
+        Builds a board matrix from the bitboards when in bitboard
+        mode. 0 is the player board, 1 is the shot board
+        '''
+        matrix = [[EMPTY] * self.b_size for row in range(self.b_size)]
+
+        # gathers (mask, cell type) layers in painting order
+        if choice == 0:
+            hits = self.opp_shots & self.player_cells
+            layers = [(self.player_cells, FRIENDLY),
+                      (self.opp_shots & ~hits, MISS), (hits, HIT)]
+            if self.phase == 1 and self.placement_drawn:
+                layers.insert(0, (cells_to_mask(self.last_placement), PLACING))
+        else:
+            opp_cells = self.opp_ship_cells or 0
+            hits = self.player_shots & opp_cells
+            layers = [(self.player_shots & ~hits, MISS), (hits, HIT)]
+            if self.revealed:
+                layers.append((opp_cells & ~hits, PLACING))
+
+        # paints each layer onto the matrix
+        for mask, cell_type in layers:
+            for cell in mask_to_cells(mask):
+                row, col = self.num_to_matrix(cell)
+                matrix[row][col] = cell_type
+        return matrix
+
+    def new_cell_group(self):
+        '''
+        Returns an empty group of cells (list or bitboard)
+        '''
+        if self.bitboard:
+            return 0
+        return []
+
+    def has_cell(self, group, cell):
+        '''
+        Checks if a cell is inside of a group of cells
+        '''
+        if self.bitboard:
+            return (group >> cell) & 1 == 1
+        return cell in group
+
+    def add_cells(self, group, cells):
+        '''
+        Adds cells to a group of cells, returns the updated group
+        '''
+        if self.bitboard:
+            return group | cells_to_mask(cells)
+        group.extend(cells)
+        return group
+
+    def get_cells(self, group):
+        '''
+        Returns a group of cells as a list of cells
+        '''
+        if self.bitboard:
+            return mask_to_cells(group)
+        return list(group)
             
     def matrix_to_num(self,row:int,col:int) -> int:
         '''
@@ -391,29 +550,33 @@ class Game:
         '''
         When called, reveals all unhit ship cells on the opponent's board
         '''
+        self.revealed = True
         if self.opp_ship_cells:
-            for cell in self.opp_ship_cells:
-                row, col = self.num_to_matrix(cell)
-                if self.shot_board[row][col] != 2:
-                    self.shot_board[row][col] = 3
+            unhit = []
+            for cell in self.get_cells(self.opp_ship_cells):
+                if not self.has_cell(self.player_shots, cell):
+                    unhit.append(cell)
+            self.update_board(SHOT_BOARD, unhit, PLACING)
     
+    @hot
     def fire(self, cell):
         '''
         Fires player's sho
         '''
         self.shot_count = self.shot_count + 1   # updates stats
+        self.moves.append(cell * 2)
         
         # already shot case
-        if cell in self.player_shots:
+        if self.has_cell(self.player_shots, cell):
             self.turn = 1
             return 'You shot at that cell already! (wasted turn)'
-        self.player_shots.append(cell)
+        self.player_shots = self.add_cells(self.player_shots, [cell])
         
         # hit case
-        if cell in self.opp_ship_cells:
+        if self.has_cell(self.opp_ship_cells, cell):
             self.hit_count = self.hit_count + 1   # updates stats
-            self.update_board(self.shot_board,[cell],HIT)
-            was_sunk = self.check_sunk()
+            self.update_board(SHOT_BOARD,[cell],HIT)
+            was_sunk = self.check_sunk(cell)
             if was_sunk != False:
                 result = was_sunk
             else:
@@ -421,7 +584,7 @@ class Game:
 
         # miss case
         else:
-            self.update_board(self.shot_board,[cell],MISS)
+            self.update_board(SHOT_BOARD,[cell],MISS)
             result = 'You missed!'
         self.turn = 1
         return result
@@ -448,27 +611,138 @@ class Game:
             
         return str(hit_perc), str(self.shot_count), str(opp_hit_perc), opp_ships
             
+    ### SNAPSHOTS ###
+    def snapshot(self):
+        '''
+        Returns the full game state, the AI's included, as a
+        versioned byte blob that restore() turns back into a Game
+        '''
+        writer = SnapshotWriter()
+        writer.add(self.opponent, self.b_size, self.ai_diff, self.bitboard)
+        writer.add_random(self.rng)   # the AI shares it
+        writer.add_list(self.ship_sizes)
+        writer.add(self.starter, self.phase, self.turn, self.ships_to_place, self.revealed,
+                   self.shot_count, self.hit_count, self.opp_shot_count, self.opp_hit_count)
+        writer.add_list(self.moves.tolist())
+
+        # player side, remaining ships are saved as fleet ship ids
+        writer.add_list(self.last_placement)
+        writer.add(self.placement_drawn)
+        writer.add_list(self.get_cells(self.player_cells))
+        writer.add_list(self.get_cells(self.player_shots))
+        writer.add_lists(self.own_fleet.ships)
+        writer.add_list(self.own_fleet.hit_cells())
+        writer.add_list([self.own_fleet.ship_of(ship[0]) for ship in self.individual_locations])
+
+        # opponent side, ships are None until known
+        writer.add_list(self.get_cells(self.opp_shots))
+        writer.add(self.opp_fleet is not None)
+        if self.opp_fleet is not None:
+            writer.add_list(self.get_cells(self.opp_ship_cells))
+            writer.add_lists(self.opp_fleet.ships)
+            writer.add_list(self.opp_fleet.hit_cells())
+            writer.add_list([self.opp_fleet.ship_of(ship[0]) for ship in self.opp_indiv_ships])
+
+        # list boards can't always be rebuilt from the cells
+        if not self.bitboard:
+            boards = None
+            if self.own_board is not None:
+                boards = [value for board in (self.own_board, self.shot_board)
+                          for row in board for value in row]
+            writer.add_list(boards)
+
+        writer.add(self.ai is not None)
+        if self.ai is not None:
+            self.ai.write_state(writer)
+        return writer.to_bytes(SNAPSHOT_MAGIC)
+
+    @classmethod
+    def restore(cls, data, seed=None):
+        '''
+        Rebuilds a Game from a snapshot blob. A seeded game carries on
+        from its saved random state, unless given a new seed to branch
+        off with. One that drew from the random module keeps using it
+        '''
+        reader = SnapshotReader(SNAPSHOT_MAGIC, data)
+        try:
+            game = cls.read_snapshot(reader, seed)
+        except CORRUPT_ERRORS:
+            raise Exception('Snapshot Error: Corrupt snapshot')
+        reader.finish()
+        return game
+
+    @classmethod
+    def read_snapshot(cls, reader, seed=None):
+        '''
+        Reads back the state written by snapshot
+        '''
+        opponent, b_size, ai_diff, bitboard = reader.read(4)
+        state = reader.read_random()
+        if seed is None and state is not None:
+            seed = random.Random()   # given the saved state once rebuilt
+        game = cls(opponent, b_size, reader.read_list(), ai_diff, bitboard == 1, seed)
+        (game.starter, game.phase, game.turn, game.ships_to_place, revealed, game.shot_count,
+         game.hit_count, game.opp_shot_count, game.opp_hit_count) = reader.read(9)
+        game.revealed = revealed == 1
+        game.moves = array('H', reader.read_list())
+
+        # player side
+        game.last_placement = reader.read_list()
+        game.placement_drawn = reader.read() == 1
+        game.player_cells = game.add_cells(game.new_cell_group(), reader.read_list())
+        game.player_shots = game.add_cells(game.new_cell_group(), reader.read_list())
+        game.own_fleet = Fleet(reader.read_lists())
+        for cell in reader.read_list():
+            game.own_fleet.hit(cell)
+        game.individual_locations = [game.own_fleet.ships[ship_id]
+                                     for ship_id in reader.read_list()]
+
+        # opponent side
+        game.opp_shots = game.add_cells(game.new_cell_group(), reader.read_list())
+        if reader.read():
+            game.opp_ship_cells = game.add_cells(game.new_cell_group(), reader.read_list())
+            game.opp_fleet = Fleet(reader.read_lists())
+            for cell in reader.read_list():
+                game.opp_fleet.hit(cell)
+            game.opp_indiv_ships = [game.opp_fleet.ships[ship_id]
+                                    for ship_id in reader.read_list()]
+
+        # boards
+        if not game.bitboard:
+            boards = reader.read_list()
+            if boards is not None:
+                rows = [boards[start:start + b_size] for start in range(0, len(boards), b_size)]
+                game.own_board, game.shot_board = rows[:b_size], rows[b_size:]
+
+        # AI, sharing the ship lists the game removes sunk ships from
+        if reader.read():
+            from .ai import WaveWatch
+            game.ai = WaveWatch.read_state(reader, game.rng)
+            game.opp_indiv_ships = game.ai.individual_ships
+            if game.ai.player_ships is not None:
+                game.ai.player_ships = game.individual_locations
+        if state is not None and game.rng is seed:   # rebuilding the AI drew from it
+            game.rng.setstate(state)
+        return game
+
     ### SHIP PLACEMENT METHODS ###
+    @hot
     def randomize_placement(self,ship_len):
         '''
         Returns a randomly selected legal set of cells to place
-        the ship around the board
-        '''
-        found = 0  # 0 found, 100 unable to place
-        while found != 100:
-            orientation = random.choice(('v','h'))
-            if orientation == 'v':
-                row_lim, col_lim = ship_len, 0
-            else:
-                row_lim, col_lim = 0, ship_len
-            row = random.choice((range(0,self.b_size-row_lim)))
-            col = random.choice((range(0,self.b_size-col_lim)))
-            cells = self.get_ship_cells(row,col,orientation,ship_len)
-            if self.is_ship_overlap(cells,self.player_cells):
-                found += 1
-            else:
-                return cells
-        raise Exception('Error: No space for remaining ships!')
+        the ship around the board, leaving room for the ships
+        still to place after it whenever they can fit
+        '''
+        occupied = self.player_cells
+        if not self.bitboard:
+            occupied = cells_to_mask(occupied)
+        later = self.ship_sizes[:max(self.ships_to_place - 1, 0)]
+        fleet = sample_fleet(self.b_size, [ship_len] + later, occupied, self.rng)
+        if fleet is None:   # ships moved by hand may leave no room for the rest
+            fleet = sample_fleet(self.b_size, [ship_len], occupied, self.rng)
+        if fleet is None:
+            raise Exception('Error: No space for remaining ships!')
+        return fleet[0]
     
     def get_ship_cells(self,row,col,orientation,length):
         '''Returns all occupied ship cells based on ships data'''
@@ -489,11 +763,11 @@ class Game:
                 cells.append(self.matrix_to_num(static,dynamic))
         return cells
         
+    @hot
     def start_place_ship(self):
         '''
         Grabs a ship and begins placement process
         '''
-        board = self.own_board
         ships = self.ship_sizes
         self.phase = 1
         if len(ships) == 0:
@@ -502,9 +776,12 @@ class Game:
         # places ship and updates board
         ship = ships[self.ships_to_place - 1]  # selects individual ship
         cells = self.randomize_placement(ship)
-        self.update_board(board,cells,PLACING)
+        self.mark_changed(OWN_BOARD, self.last_placement)   # no longer drawn when rendered
+        self.update_board(OWN_BOARD,cells,PLACING)
         self.last_placement = cells[:]
+        self.placement_drawn = True
         
+    @hot
     def place_ship(self):
         '''
         Places the ship on the board when Player is happy with
@@ -516,21 +793,24 @@ class Game:
         # no overlap case
         if not self.is_ship_overlap(ship_cells,player_cells): 
             self.ships_to_place -= 1
-            self.update_board(self.own_board, ship_cells, FRIENDLY)
+            self.update_board(OWN_BOARD, ship_cells, FRIENDLY)
             self.individual_locations.append(ship_cells)
-            self.player_cells = player_cells + ship_cells
+            self.own_fleet.add_ship(ship_cells)
+            self.player_cells = self.add_cells(player_cells, ship_cells)
 
             if self.ships_to_place == 0:  # done placing
                 if self.ai:
-                    self.ai.set_player_pos(self.individual_locations,self.player_cells)
+                    cells = self.get_cells(self.player_cells)
+                    self.ai.set_player_pos(self.individual_locations,cells,self.own_fleet)
                 self.phase = 2
                 return 'Done placing!'
             return 'Ship placed successfully!'  # more to place
 
         # overlap case
         else:
-            self.update_board(self.own_board, self.last_placement, EMPTY)
-            self.update_board(self.own_board, self.player_cells, FRIENDLY)
+            self.update_board(OWN_BOARD, self.last_placement, EMPTY)
+            self.update_board(OWN_BOARD, self.get_cells(self.player_cells), FRIENDLY)
+            self.placement_drawn = False   # cleared from both kinds of board
             return 'Ships cannot overlap!'
         
     def check_out_of_bounds(self,cell_list):
@@ -601,12 +881,25 @@ class Game:
             self.execute_move(attempted_pos)
         else:
             return OOB_MSG
-        
+
+    def set_placement(self, cells):
+        '''
+        Moves the ship being placed straight onto the given cells,
+        used for scripted placements. Returns message if illegal
+        '''
+        if len(cells) != len(self.last_placement):
+            raise Exception('Game Error: Placement does not match ship length')
+        if self.check_out_of_bounds(cells):
+            return OOB_MSG
+        self.execute_move(list(cells))
+
     def is_ship_overlap(self,indiv_ship,group_ships):
         '''
         Checks if the cells of an individual ship are inside of
         a larger group of ship cells. If overlap, return True
         '''
+        if self.bitboard:
+            return cells_to_mask(indiv_ship) & group_ships != 0
         for cell in indiv_ship:
             if cell in group_ships:
                 return True
@@ -617,11 +910,11 @@ class Game:
         Now that move has been processed and verified,
         updates board
         '''
-        board = self.own_board
-        self.update_board(board,self.last_placement,EMPTY)
-        self.update_board(board,new_pos,PLACING)
-        self.update_board(self.own_board, self.player_cells, FRIENDLY)
+        self.update_board(OWN_BOARD,self.last_placement,EMPTY)
+        self.update_board(OWN_BOARD,new_pos,PLACING)
+        self.update_board(OWN_BOARD, self.get_cells(self.player_cells), FRIENDLY)
         self.last_placement = new_pos   # keeps track of this as last move
+        self.placement_drawn = True
         
     def rotate(self,cell_list):
         '''
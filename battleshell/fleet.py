@@ -0,0 +1,85 @@
+'''
+BattleShell Fleet V1.0
+
+Keeps a cell -> ship index for a group of ships along with the number
+of unhit cells left on each ship. Built once at placement time so a hit
+resolves which ship it struck, and whether it sunk it, in O(1). The
+index is a bytearray of ship id + 1 per cell and the hits a bitmask, so
+a fleet stays a few hundred bytes on any board.
+
+Author: Paul Belland
+'''
+
+class Fleet:
+    def __init__(self, ships=()):
+        self.ships = []   # cells of each ship, by ship id
+        self.index = bytearray()   # cell -> ship id + 1, 0 if empty
+        self.remaining = []   # unhit cells left per ship id
+        self.hits = 0   # bitmask of the ship cells hit
+        for ship in ships:
+            self.add_ship(ship)
+
+    def add_ship(self, ship):
+        '''
+        Adds a ship to the fleet, returns its ship id. A list of cells
+        is kept as is rather than copied
+        '''
+        ship_id = len(self.ships)
+        if not isinstance(ship, list):
+            ship = list(ship)
+        self.ships.append(ship)   # shared with the caller, ships are never changed
+        self.remaining.append(len(ship))
+        for cell in ship:
+            if cell >= len(self.index):
+                self.index.extend(bytes(cell + 1 - len(self.index)))
+            self.index[cell] = ship_id + 1
+        return ship_id
+
+    def ship_of(self, cell):
+        '''
+        Returns the id of the ship on a cell, None if empty
+        '''
+        if cell is not None and cell < len(self.index) and self.index[cell]:
+            return self.index[cell] - 1
+        return None
+
+    def hit(self, cell):
+        '''
+        Registers a shot on a cell. Returns the id of the ship hit
+        (None on a miss) and whether that hit sunk it
+        '''
+        ship_id = self.ship_of(cell)
+        if ship_id is None or (self.hits >> cell) & 1:
+            return ship_id, False
+        self.hits |= 1 << cell
+        self.remaining[ship_id] -= 1
+        return ship_id, self.remaining[ship_id] == 0
+
+    def is_sunk(self, ship_id):
+        '''
+        Checks if every cell of a ship has been hit
+        '''
+        return self.remaining[ship_id] == 0
+
+    def hit_cells(self):
+        '''
+        Returns the ship cells hit so far, in order
+        '''
+        cells = []
+        hits = self.hits
+        while hits:
+            low = hits & -hits
+            cells.append(low.bit_length() - 1)
+            hits ^= low
+        return cells
+
+    def tracker(self):
+        '''
+        Returns a fleet sharing these ships and this index but with
+        its own hit counters, so another shooter can track its shots
+        '''
+        copy = Fleet()
+        copy.ships = self.ships
+        copy.index = self.index
+        copy.remaining = [len(ship) for ship in self.ships]
+        return copy
@@ -0,0 +1,144 @@
+'''
+BattleShell Instrumentation V1.0
+
+Opt-in call counts and wall times for the hot methods of the engine, the
+AI, the GUI and the network classes. Methods are marked with @hot and
+their class with @instrumented. While instrumentation is off the marked
+methods are left exactly as written, so it costs nothing. It is turned
+on by the BSHELL_PERF environment variable, or by calling enable()
+before the work to measure, and then every marked method is wrapped
+with a timer. Times are inclusive, ie. WaveWatch.get_shot includes the
+adv_search it calls.
+
+   BSHELL_PERF=1 python main.py
+
+get_perf_stats() returns the numbers so far, and they are printed when
+the program exits. Worker processes hand theirs to the parent with
+take_raw_stats() and merge_raw_stats().
+
+Author: Paul Belland
+'''
+
+import atexit
+import functools
+import os
+import sys
+import time
+
+ENABLED = False
+CLASSES = []   # every @instrumented class, wrapped when enabled
+STATS = {}   # 'Class.method' -> [calls, total seconds, max seconds]
+
+def hot(func):
+    '''
+    Marks a method to be timed while instrumentation is on
+    '''
+    func.perf_hot = True
+    return func
+
+def instrumented(cls):
+    '''
+    Class decorator, registers a class whose @hot methods get timed
+    '''
+    CLASSES.append(cls)
+    if ENABLED:
+        wrap_class(cls)
+    return cls
+
+def wrap_class(cls):
+    '''
+    Replaces the @hot methods of a class with timed ones
+    '''
+    for name, value in list(vars(cls).items()):
+        if getattr(value, 'perf_hot', False):
+            setattr(cls, name, timer(f'{cls.__name__}.{name}', value))
+
+def timer(name, func):
+    '''
+    Returns func wrapped to add its calls and time to STATS[name]
+    '''
+    stat = STATS.setdefault(name, [0, 0.0, 0.0])
+    clock = time.perf_counter
+
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        start = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            took = clock() - start
+            stat[0] += 1
+            stat[1] += took
+            if took > stat[2]:
+                stat[2] = took
+    timed.perf_hot = False   # wraps copied the mark, never wrap twice
+    return timed
+
+def enable():
+    '''
+    Turns instrumentation on for every class registered so far and
+    every class registered later, the stats are printed at exit
+    '''
+    global ENABLED
+    if ENABLED:
+        return
+    ENABLED = True
+    for cls in CLASSES:
+        wrap_class(cls)
+    atexit.register(dump)
+
+def get_perf_stats():
+    '''
+    Returns {'Class.method': {'calls', 'total_ms', 'max_ms', 'mean_us'}}
+    for every timed method called so far, empty when disabled
+    '''
+    stats = {}
+    for name, (calls, total, longest) in STATS.items():
+        if calls:
+            stats[name] = {
+                'calls': calls,
+                'total_ms': total * 1000,
+                'max_ms': longest * 1000,
+                'mean_us': total / calls * 1e6,
+            }
+    return stats
+
+def take_raw_stats():
+    '''
+    Returns the raw counters and zeroes them, ie. for a worker process
+    to hand its share to the parent's merge_raw_stats
+    '''
+    raw = {name: stat[:] for name, stat in STATS.items() if stat[0]}
+    reset_perf_stats()
+    return raw
+
+def merge_raw_stats(raw):
+    '''
+    Adds counters taken in another process to this one's
+    '''
+    for name, (calls, total, longest) in raw.items():
+        stat = STATS.setdefault(name, [0, 0.0, 0.0])
+        stat[0] += calls
+        stat[1] += total
+        stat[2] = max(stat[2], longest)
+
+def reset_perf_stats():
+    '''
+    Zeroes every counter, ie. between two parts of a run
+    '''
+    for stat in STATS.values():
+        stat[:] = [0, 0.0, 0.0]
+
+def dump(out=None):
+    '''
+    Prints the stats, most total time first
+    '''
+    out = out or sys.stderr
+    stats = get_perf_stats()
+    print(f"{'method':<32}{'calls':>10}{'total ms':>12}{'max ms':>10}{'mean us':>10}", file=out)
+    for name, stat in sorted(stats.items(), key=lambda item: -item[1]['total_ms']):
+        print(f"{name:<32}{stat['calls']:>10}{stat['total_ms']:>12.2f}"
+              f"{stat['max_ms']:>10.3f}{stat['mean_us']:>10.1f}", file=out)
+
+if os.environ.get('BSHELL_PERF'):
+    enable()
@@ -0,0 +1,135 @@
+'''
+BattleShell Placements V1.0
+
+Precomputed placement tables shared by the game and the AI. The geometry
+of every legal ship placement only depends on the board size and the ship
+length, so each table is built once per process and kept in a bounded
+LRU cache for every Game and WaveWatch that needs it.
+
+Whole fleets are sampled straight from the tables: each ship is drawn
+from its placements that miss an occupancy bitmask, and the search
+backtracks when a later ship has no room, so any fleet that fits is
+always placed. Within the game's limits (at most b_size ships, each
+shorter than the board) every fleet fits, one ship per row, so no
+separate feasibility check is needed.
+
+Author: Paul Belland
+'''
+
+import random
+from functools import lru_cache
+
+# (board size, ship length) pairs kept, covers every pair on a 26x26 board
+TABLE_CACHE_SIZE = 1024
+QUICK_DRAWS = 4   # random draws tried before listing every legal placement
+
+class PlacementTable:
+    '''
+    Every legal placement of one ship length on one board size.
+    Horizontal placements come first, then vertical ones.
+    - cells: tuple of cell tuples, one per placement
+    - masks: the same placements packed as bitboard ints
+    '''
+    __slots__ = ('b_size', 'length', 'cells', 'masks')
+
+    def __init__(self, b_size, length):
+        self.b_size = b_size
+        self.length = length
+        cells = []
+
+        # horizontal placements
+        for row in range(b_size):
+            for col in range(b_size - length + 1):
+                start = row * b_size + col
+                cells.append(tuple(range(start, start + length)))
+
+        # vertical placements
+        for row in range(b_size - length + 1):
+            for col in range(b_size):
+                start = row * b_size + col
+                cells.append(tuple(range(start, start + length * b_size, b_size)))
+
+        self.cells = tuple(cells)
+        self.masks = tuple(sum(1 << cell for cell in ship) for ship in cells)
+
+    def __len__(self):
+        return len(self.cells)
+
+@lru_cache(maxsize=TABLE_CACHE_SIZE)
+def placement_table(b_size, length):
+    '''
+    Returns the shared placement table for a board size and ship length.
+    Ships longer than the board get an empty table
+    '''
+    if length < 1:
+        raise Exception('Placement Error: Ship length must be at least 1')
+    return PlacementTable(b_size, length)
+
+def legal_placements(b_size, length, occupied=0):
+    '''
+    Returns the indexes into placement_table(b_size, length) of every
+    placement not touching a cell of the occupied bitmask
+    '''
+    masks = placement_table(b_size, length).masks
+    return [index for index, mask in enumerate(masks) if not mask & occupied]
+
+def sample_fleet(b_size, ship_lengths, occupied=0, rng=random):
+    '''
+    Returns random legal cells for every ship length, in the given order,
+    none of them touching the occupied bitmask or each other. Returns
+    None if the fleet cannot fit
+    '''
+    # longest ships first, they have the fewest placements
+    order = sorted(range(len(ship_lengths)), key=lambda i: ship_lengths[i], reverse=True)
+    tables = [placement_table(b_size, ship_lengths[i]) for i in order]
+    chosen = [None] * len(order)
+    dead_ends = set()   # (occupied, depth) known to have no room for the rest
+
+    def place(depth, occupied):
+        if depth == len(tables):
+            return True
+        if (occupied, depth) in dead_ends:
+            return False
+        masks = tables[depth].masks
+
+        # on a sparse board a plain random draw is usually legal
+        for i in range(QUICK_DRAWS if masks else 0):
+            index = rng.randrange(len(masks))
+            if not masks[index] & occupied:
+                if place(depth + 1, occupied | masks[index]):
+                    chosen[depth] = index
+                    return True
+                break
+
+        options = [index for index, mask in enumerate(masks) if not mask & occupied]
+
+        # draws without replacement, backtracking on dead ends
+        while options:
+            pick = rng.randrange(len(options))
+            options[pick], options[-1] = options[-1], options[pick]
+            index = options.pop()
+            if place(depth + 1, occupied | masks[index]):
+                chosen[depth] = index
+                return True
+        dead_ends.add((occupied, depth))
+        return False
+
+    if not place(0, occupied):
+        return None
+    fleet = [None] * len(order)
+    for depth, ship in enumerate(order):
+        fleet[ship] = list(tables[depth].cells[chosen[depth]])
+    return fleet
+
+def sample_fleets(b_size, ship_lengths, count, rng=random):
+    '''
+    Returns count random legal fleets of ship_lengths on an empty board,
+    ie. for simulations or seeding AI layouts
+    '''
+    fleets = []
+    for i in range(count):
+        fleet = sample_fleet(b_size, ship_lengths, rng=rng)
+        if fleet is None:
+            raise Exception('Placement Error: Fleet does not fit on the board')
+        fleets.append(fleet)
+    return fleets
@@ -0,0 +1,247 @@
+'''
+BattleShell Game Records V1.0
+
+Compact binary archive of finished games. A record file starts with a
+4 byte header (b'BSR' and a format version) followed by records, each
+prefixed by its length. Every number in a record is a LEB128 varint so
+cells on any board up to 26x26 take one or two bytes:
+   - settings: opponent, board size, AI difficulty, starter (2 for None)
+   - ship sizes: count, then each size
+   - player ships, opponent ships: count, then per ship its length
+     followed by its cells, in placement order
+   - moves: count, then each shot as cell * 2 + shooter (0 player,
+     1 opponent)
+
+Records are written one at a time and read back with a generator, so
+files holding millions of games never need to fit in memory. replay()
+rebuilds the Game of a record as it stood after any move.
+
+Author: Paul Belland
+'''
+
+from .bshell import Game
+
+MAGIC = b'BSR'
+VERSION = 1
+HEADER = MAGIC + bytes([VERSION])
+NO_STARTER = 2
+READ_SIZE = 1 << 16
+
+### VARINTS ###
+def write_varint(out, number):
+    '''
+    Appends an unsigned int to a bytearray as a LEB128 varint
+    '''
+    while number > 0x7f:
+        out.append(number & 0x7f | 0x80)
+        number >>= 7
+    out.append(number)
+
+def read_varint(data, offset):
+    '''
+    Reads a varint from data at offset, returns (number, next offset).
+    Raises IndexError if data ends mid varint
+    '''
+    number = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        number |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return number, offset
+        shift += 7
+
+class GameRecord:
+    '''
+    Everything needed to replay one game
+    - ship_sizes: the game's ship list, in settings order
+    - own_ships, opp_ships: ship cells in placement order
+    - moves: (shooter, cell) of every shot, 0 player, 1 opponent
+    '''
+    __slots__ = ('opponent', 'b_size', 'ai_diff', 'starter', 'ship_sizes',
+                 'own_ships', 'opp_ships', 'moves')
+
+    def __init__(self, opponent, b_size, ai_diff, starter, ship_sizes,
+                 own_ships, opp_ships, moves):
+        self.opponent = opponent
+        self.b_size = b_size
+        self.ai_diff = ai_diff
+        self.starter = starter
+        self.ship_sizes = ship_sizes
+        self.own_ships = own_ships
+        self.opp_ships = opp_ships
+        self.moves = moves
+
+    @classmethod
+    def from_game(cls, game):
+        '''
+        Captures the settings, fleets and moves of a Game
+        '''
+        opp_ships = game.opp_fleet.ships if game.opp_fleet else []
+        return cls(game.opponent, game.b_size, game.ai_diff, game.starter,
+                   list(game.ship_sizes), [list(ship) for ship in game.own_fleet.ships],
+                   [list(ship) for ship in opp_ships],
+                   [(move & 1, move >> 1) for move in game.moves])
+
+### ENCODING ###
+def encode_record(record):
+    '''
+    Packs a GameRecord into its record bytes, without the length prefix
+    '''
+    out = bytearray()
+    starter = NO_STARTER if record.starter is None else record.starter
+    for number in (record.opponent, record.b_size, record.ai_diff, starter):
+        write_varint(out, number)
+    write_varint(out, len(record.ship_sizes))
+    for size in record.ship_sizes:
+        write_varint(out, size)
+    for ships in (record.own_ships, record.opp_ships):
+        write_varint(out, len(ships))
+        for ship in ships:
+            write_varint(out, len(ship))
+            for cell in ship:
+                write_varint(out, cell)
+    write_varint(out, len(record.moves))
+    for shooter, cell in record.moves:
+        write_varint(out, cell * 2 + shooter)
+    return bytes(out)
+
+def decode_record(data, offset=0):
+    '''
+    Unpacks record bytes starting at offset back into a GameRecord
+    '''
+    settings = []
+    for i in range(4):
+        number, offset = read_varint(data, offset)
+        settings.append(number)
+    opponent, b_size, ai_diff, starter = settings
+    if starter == NO_STARTER:
+        starter = None
+
+    count, offset = read_varint(data, offset)
+    ship_sizes = []
+    for i in range(count):
+        size, offset = read_varint(data, offset)
+        ship_sizes.append(size)
+
+    fleets = []
+    for fleet in range(2):
+        count, offset = read_varint(data, offset)
+        ships = []
+        for i in range(count):
+            length, offset = read_varint(data, offset)
+            ship = []
+            for j in range(length):
+                cell, offset = read_varint(data, offset)
+                ship.append(cell)
+            ships.append(ship)
+        fleets.append(ships)
+
+    count, offset = read_varint(data, offset)
+    moves = []
+    for i in range(count):
+        move, offset = read_varint(data, offset)
+        moves.append((move & 1, move >> 1))
+    return GameRecord(opponent, b_size, ai_diff, starter, ship_sizes,
+                      fleets[0], fleets[1], moves)
+
+### FILES ###
+class RecordWriter:
+    '''
+    Streams records to a file, appending to it if it already
+    holds records. Usable as a context manager
+    '''
+    def __init__(self, path):
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(HEADER)
+
+    def write(self, game):
+        '''
+        Writes a Game, or a GameRecord, as the next record
+        '''
+        if isinstance(game, Game):
+            game = GameRecord.from_game(game)
+        self.write_bytes(encode_record(game))
+
+    def write_bytes(self, data):
+        '''
+        Writes already encoded record bytes as the next record
+        '''
+        prefix = bytearray()
+        write_varint(prefix, len(data))
+        self.file.write(prefix)
+        self.file.write(data)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def read_records(path, read_size=READ_SIZE):
+    '''
+    Generator yielding every GameRecord of a file in order, only
+    a chunk of the file is held in memory at a time
+    '''
+    with open(path, 'rb') as records:
+        if records.read(len(HEADER)) != HEADER:
+            raise Exception('Record Error: Not a version 1 game record file')
+        data = b''
+        offset = 0
+        while True:
+            chunk = records.read(read_size)
+            data = data[offset:] + chunk
+            offset = 0
+
+            # yields each complete record in the buffer
+            while True:
+                try:
+                    length, start = read_varint(data, offset)
+                except IndexError:
+                    break
+                if start + length > len(data):
+                    break
+                yield decode_record(data[start:start + length])
+                offset = start + length
+
+            if not chunk:
+                if offset != len(data):
+                    raise Exception('Record Error: File ends mid record')
+                return
+
+### REPLAY ###
+def replay(record, move=None, bitboard=False):
+    '''
+    Rebuilds the Game of a record after its first move shots, or
+    after every shot if move is None. No AI is attached to the
+    rebuilt game, its opponent ships are set from the record as in
+    a multiplayer game. The game gets its own seed, so placing the
+    ships leaves the random module untouched
+    '''
+    game = Game(1, record.b_size, record.ship_sizes, record.ai_diff, bitboard, seed=0)
+    game.set_starter(0 if record.starter is None else record.starter)
+    game.start_game()
+    if record.opp_ships:
+        game.set_opponent_ships([list(ship) for ship in record.opp_ships])
+
+    # places the player's ships as they were
+    for ship in record.own_ships:
+        game.start_place_ship()
+        game.set_placement(ship)
+        game.place_ship()
+
+    # plays the shots
+    moves = record.moves if move is None else record.moves[:move]
+    for shooter, cell in moves:
+        game.set_turn(shooter)
+        if shooter == 0:
+            game.fire(cell)
+        else:
+            game.opponent_fire(cell)
+        game.check_game_over()
+    return game
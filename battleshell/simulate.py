@@ -0,0 +1,197 @@
+'''
+BattleShell Simulator V1.0
+
+This program plays headless AI vs AI games of Battleship through the
+Game class at full speed. Games are spread over a pool of worker
+processes and the result of every game is streamed to a CSV file.
+
+The game's own WaveWatch plays as the opponent, while a second WaveWatch
+(the shooter) takes the player's shots. The player's ships are placed
+either by the Game's random placement or by a WaveWatch layout.
+Every game can also be archived to a binary game record file.
+
+Usage:
+   python -m battleshell.simulate --games 10000 --b-size 10 --ships 5,4,3,3,2
+                      --difficulty 3 --out results.csv --record games.bsr
+
+Author: Paul Belland
+'''
+
+import argparse
+import csv
+import multiprocessing
+import random
+import sys
+import time
+from .bshell import Game
+from .ai import WaveWatch
+from .record import GameRecord, RecordWriter, encode_record
+from . import perf
+
+FIELDS = ('game', 'seed', 'winner', 'turns', 'shots', 'hits', 'hit_perc',
+          'opp_shots', 'opp_hits', 'opp_hit_perc', 'error')
+PLACEMENTS = ('game', 'ai')
+MAX_ERROR_RATE = 0.05   # share of errored games the CLI accepts
+
+def place_ships(game, placement, b_size, fleet, difficulty):
+    '''
+    Places all of the player's ships, either randomly through the
+    Game or with the layout a WaveWatch would choose
+    '''
+    if placement == 'ai':
+        placer = WaveWatch(difficulty, b_size, fleet, game.rng)
+        placer.start()
+        by_length = {}
+        for ship in placer.get_ai_ships()[1]:
+            by_length.setdefault(len(ship), []).append(ship)
+
+    while game.get_phase() in (0, 1):
+        game.start_place_ship()
+        if placement == 'ai':
+            ship_len = len(game.last_placement)
+            game.set_placement(by_length[ship_len].pop())
+        game.place_ship()
+
+def play_game(b_size, fleet, difficulty, shooter_diff, placement, record, seed):
+    '''
+    Plays a single game between the shooter and the game's AI,
+    returns the final statistics of the game, along with its
+    encoded game record if asked for
+    '''
+    rng = random.Random(seed)   # the game, its AI and the shooter all draw from it
+    game = Game(0, b_size, fleet, difficulty, bitboard=True, seed=rng)
+    game.set_starter(rng.randint(0, 1))
+    game.start_game()
+    place_ships(game, placement, b_size, fleet, shooter_diff)
+
+    # the shooter only checks against the AI ships, same as WaveWatch does
+    shooter = WaveWatch(shooter_diff, b_size, fleet, rng)
+    shooter.set_player_pos(game.opp_indiv_ships, game.get_cells(game.opp_ship_cells),
+                           game.opp_fleet)
+
+    # plays until someone wins or turn limit is hit
+    turns = 0
+    turn_limit = 4 * b_size ** 2
+    while not game.check_game_over():
+        if turns == turn_limit:
+            raise Exception('Simulation Error: Turn limit reached')
+        if game.get_turn() == 0:
+            game.fire(shooter.get_shot())
+        else:
+            game.get_ai_shot()
+        turns += 1
+
+    # winner: 0 shooter, 1 the game's AI
+    winner = 0
+    if len(game.get_own_ships()) == 0:
+        winner = 1
+    result = {'winner': winner, 'turns': turns,
+              'shots': game.shot_count, 'hits': game.hit_count,
+              'opp_shots': game.opp_shot_count, 'opp_hits': game.opp_hit_count}
+    if record:
+        result['record'] = encode_record(GameRecord.from_game(game))
+    return result
+
+def run_game(args):
+    '''
+    Worker entry point, plays one game and returns a result row.
+    AI errors are recorded instead of stopping the whole run
+    '''
+    index, seed, settings = args
+    row = {'game': index, 'seed': seed, 'error': ''}
+    try:
+        row.update(play_game(*settings, seed))
+        row['hit_perc'] = round(row['hits'] / row['shots'] * 100, 2)
+        row['opp_hit_perc'] = round(row['opp_hits'] / row['opp_shots'] * 100, 2)
+    except Exception as error:
+        row['error'] = f'{type(error).__name__}: {error}'
+    if perf.ENABLED:   # workers exit without running atexit
+        row['perf'] = perf.take_raw_stats()
+    return row
+
+def simulate(out_file, games, b_size, fleet, difficulty, shooter_diff=None,
+             placement='game', workers=None, seed=0, chunk_size=64, record_file=None):
+    '''
+    Plays the given number of games over a process pool and streams
+    each result to a CSV file, and each finished game to record_file
+    if given. Returns a small summary of the run. Games that errored
+    are left out of wins and win_perc, which only cover finished games,
+    and are counted in errors, error_rate and error_kinds
+    '''
+    if placement not in PLACEMENTS:
+        raise Exception(f'Simulation Error: Placement must be one of {PLACEMENTS}')
+    if shooter_diff is None:
+        shooter_diff = difficulty
+    Game(0, b_size, fleet, difficulty)   # validates settings up front
+    Game(0, b_size, fleet, shooter_diff)
+
+    settings = (b_size, list(fleet), difficulty, shooter_diff, placement, bool(record_file))
+    tasks = ((i, seed + i, settings) for i in range(games))
+    summary = {'games': 0, 'wins': 0, 'errors': 0, 'error_kinds': {}, 'seconds': 0}
+    start = time.perf_counter()
+
+    records = RecordWriter(record_file) if record_file else None
+    with open(out_file, 'w', newline='') as results, \
+         multiprocessing.Pool(workers) as pool:
+        writer = csv.DictWriter(results, fieldnames=FIELDS, restval='')
+        writer.writeheader()
+        for row in pool.imap_unordered(run_game, tasks, chunk_size):
+            if 'record' in row:
+                records.write_bytes(row.pop('record'))
+            if 'perf' in row:
+                perf.merge_raw_stats(row.pop('perf'))
+            writer.writerow(row)
+            summary['games'] += 1
+            if row['error']:
+                summary['errors'] += 1
+                kinds = summary['error_kinds']
+                kinds[row['error']] = kinds.get(row['error'], 0) + 1
+            elif row['winner'] == 0:
+                summary['wins'] += 1
+
+    if records:
+        records.close()
+    summary['seconds'] = round(time.perf_counter() - start, 2)
+    finished = summary['games'] - summary['errors']
+    summary['win_perc'] = round(summary['wins'] / finished * 100, 2) if finished else 0
+    summary['error_rate'] = summary['errors'] / summary['games'] if summary['games'] else 0
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless AI vs AI BattleShell games')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--b-size', type=int, default=10)
+    parser.add_argument('--ships', default='5,4,3,3,2', help='comma separated ship lengths')
+    parser.add_argument('--difficulty', type=int, default=3, help="game AI difficulty (1-3)")
+    parser.add_argument('--shooter-difficulty', type=int, default=None,
+                        help='shooter difficulty (1-3), defaults to --difficulty')
+    parser.add_argument('--placement', choices=PLACEMENTS, default='game',
+                        help="player ship placement: Game random or WaveWatch layout")
+    parser.add_argument('--workers', type=int, default=None, help='defaults to CPU count')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game')
+    parser.add_argument('--out', default='results.csv')
+    parser.add_argument('--record', default=None, help='game record file to archive every game to')
+    parser.add_argument('--max-error-rate', type=float, default=MAX_ERROR_RATE,
+                        help='exit with an error above this share of errored games, 0.05 is 5%%')
+    args = parser.parse_args()
+
+    fleet = [int(ship) for ship in args.ships.split(',')]
+    summary = simulate(args.out, args.games, args.b_size, fleet, args.difficulty,
+                       args.shooter_difficulty, args.placement, args.workers, args.seed,
+                       record_file=args.record)
+    rate = summary['games'] / max(summary['seconds'], 0.01) * 3600
+    print(f"{summary['games']} games in {summary['seconds']}s ({int(rate)} games/hour)")
+    finished = summary['games'] - summary['errors']
+    print(f"Shooter wins: {summary['wins']} of {finished} finished games ({summary['win_perc']}%)")
+    print(f"Errors: {summary['errors']} ({summary['error_rate']:.1%}), left out of the win counts")
+    kinds = sorted(summary['error_kinds'].items(), key=lambda item: -item[1])
+    for error, count in kinds[:5]:
+        print(f'  {count:>8}  {error}')
+    if summary['error_rate'] > args.max_error_rate:
+        print(f"WARNING: {summary['error_rate']:.1%} of games errored, over the allowed "
+              f"{args.max_error_rate:.1%}. Results are biased towards games the AI finished",
+              file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+'''
+BattleShell benchmarks, run from the repository root, ie:
+   python -m benchmarks.bench_protocol
+'''
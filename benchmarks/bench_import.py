@@ -0,0 +1,61 @@
+'''
+Import-Time Benchmark
+
+Imports each engine module in a fresh interpreter and reports the best
+import time along with how many modules came with it. Importing the
+rules engine (battleshell.bshell) must not load the AI or numpy.
+
+Usage:
+   python -m benchmarks.bench_import
+'''
+
+import subprocess
+import sys
+
+MODULES = ['battleshell', 'battleshell.bshell', 'battleshell.ai',
+           'battleshell.bs_server', 'battleshell.simulate']
+HEAVY = ['battleshell.ai', 'numpy']   # should only load with the AI
+PROBE = '''
+import sys, time
+before = set(sys.modules)
+start = time.perf_counter()
+import {module}
+took = time.perf_counter() - start
+print(took, *sorted(set(sys.modules) - before))
+'''
+
+def measure(module):
+    '''
+    Imports a module in a new interpreter, returns the seconds it
+    took and the names of every module it loaded
+    '''
+    output = subprocess.run([sys.executable, '-c', PROBE.format(module=module)],
+                            capture_output=True, text=True, check=True).stdout.split()
+    return float(output[0]), output[1:]
+
+def run(repeat=5):
+    '''
+    Measures every module, returns a list of result rows
+    '''
+    rows = []
+    for module in MODULES:
+        results = [measure(module) for i in range(repeat)]
+        loaded = results[0][1]
+        rows.append({
+            'module': module,
+            'import_ms': min(took for took, names in results) * 1000,
+            'modules': len(loaded),
+            'heavy': [name for name in HEAVY if name in loaded],
+        })
+    return rows
+
+def main():
+    print(f"{'module':<24}{'import ms':>12}{'modules':>10}  heavy")
+    for row in run():
+        heavy = ', '.join(row['heavy']) or '-'
+        print(f"{row['module']:<24}{row['import_ms']:>12.2f}{row['modules']:>10}  {heavy}")
+        if row['module'] == 'battleshell.bshell' and row['heavy']:
+            raise Exception(f'Benchmark Error: battleshell.bshell loaded {heavy}')
+
+if __name__ == '__main__':
+    main()
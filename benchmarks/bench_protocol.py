@@ -0,0 +1,70 @@
+'''
+Protocol Micro-Benchmark
+
+Compares the bytes on the wire and the encode/decode time per message of
+the bs_protocol codec against the old pickle path, for every message
+type the game sends.
+
+Usage:
+   python -m benchmarks.bench_protocol
+'''
+
+import pickle
+import timeit
+from battleshell.bs_protocol import decode, encode
+
+SHIPS = [[0, 1, 2, 3, 4], [20, 30, 40, 50], [62, 63, 64], [77, 87, 97], [8, 9]]
+BIG_SHIPS = [[row * 26 + col for col in range(25)] for row in range(26)]
+SAMPLES = [
+    ('Name', 'Paul'),
+    ('B_SIZE', '10'),
+    ('SHOT', 'J10'),
+    ('NOTIF', 'P2 Connected!'),
+    ('RESIGN', 1),
+    ('GAME_INFO', (SHIPS, 1)),
+    ('GAME_INFO', (BIG_SHIPS, None)),
+]
+
+def pickle_encode(identifier, data):
+    '''The old Server/Client payload'''
+    return pickle.dumps([identifier, data])
+
+def pickle_decode(payload):
+    message = pickle.loads(payload)
+    return message[0], message[1]
+
+def per_message(func, number):
+    '''Returns the best time per call in microseconds'''
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+def run(number=20000):
+    '''
+    Measures both codecs on every sample, returns a list of result rows
+    '''
+    rows = []
+    for identifier, data in SAMPLES:
+        packed, pickled = encode(identifier, data), pickle_encode(identifier, data)
+        if decode(packed) != (identifier, data):
+            raise Exception(f'Benchmark Error: {identifier} did not round trip')
+        rows.append({
+            'message': identifier if identifier != 'GAME_INFO' else f'GAME_INFO ({len(data[0])} ships)',
+            'bytes': len(packed),
+            'pickle_bytes': len(pickled),
+            'encode_us': per_message(lambda: encode(identifier, data), number),
+            'pickle_encode_us': per_message(lambda: pickle_encode(identifier, data), number),
+            'decode_us': per_message(lambda: decode(packed), number),
+            'pickle_decode_us': per_message(lambda: pickle_decode(pickled), number),
+        })
+    return rows
+
+def main():
+    print(f"{'message':<22}{'bytes':>14}{'encode us':>20}{'decode us':>20}")
+    print(f"{'':<22}{'codec/pickle':>14}{'codec/pickle':>20}{'codec/pickle':>20}")
+    for row in run():
+        size = f"{row['bytes']}/{row['pickle_bytes']}"
+        enc = f"{row['encode_us']:.2f}/{row['pickle_encode_us']:.2f}"
+        dec = f"{row['decode_us']:.2f}/{row['pickle_decode_us']:.2f}"
+        print(f"{row['message']:<22}{size:>14}{enc:>20}{dec:>20}")
+
+if __name__ == '__main__':
+    main()
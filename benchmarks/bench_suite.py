@@ -0,0 +1,294 @@
+'''
+Engine Benchmark Suite
+
+Times the hot paths of the engine, the AI and the network protocol on
+boards of size 5, 10, 18 and 26. Cases that depend on how far a game
+has gone run in an early phase (a few cells shot or ships placed) and a
+late phase (most of them). Every case draws from its own seeded
+random.Random, so two runs do the same work, and results are written
+as JSON for compare to check against a stored baseline.
+
+Usage:
+   python -m benchmarks.bench_suite run --out bench.json
+   python -m benchmarks.bench_suite compare baseline.json bench.json --threshold 0.15
+'''
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from battleshell.bshell import Game
+from battleshell.ai import PlacementIndex, WaveWatch
+from battleshell.bs_protocol import decode, encode
+from battleshell.placements import sample_fleet
+
+SIZES = (5, 10, 18, 26)
+FLEETS = {
+    5: [4, 3, 2],
+    10: [5, 4, 3, 3, 2],
+    18: [6, 5, 4, 4, 3, 3, 2, 2],
+    26: [8, 7, 6, 5, 5, 4, 4, 3, 3, 2, 2],
+}
+PHASES = {'early': 0.05, 'late': 0.6}   # share of cells already shot
+SEED = 1
+REPEAT = 20
+SEED_TRIES = 50   # the AI has known faults, unlucky seeds are skipped
+EMPTY_CHOICE = 'Cannot choose from an empty sequence'
+FORMAT = 1
+
+### SETUPS ###
+def placed_game(b_size, shots, rng):
+    '''
+    Returns a Game against a difficulty 1 AI with every ship placed and
+    a share of the cells already shot by both sides
+    '''
+    game = Game(0, b_size, FLEETS[b_size], 1, seed=rng)
+    game.set_starter(0)
+    game.start_game()
+    while game.get_phase() in (0, 1):
+        game.start_place_ship()
+        game.place_ship()
+
+    cells = list(range(b_size ** 2))
+    for shooter in (0, 1):
+        rng.shuffle(cells)
+        for cell in cells[:int(len(cells) * shots)]:
+            game.set_turn(shooter)
+            game.fire(cell) if shooter == 0 else game.opponent_fire(cell)
+    return game
+
+def unshot_cells(game, shots):
+    '''
+    Returns the cells not in a cell group yet, in random order
+    '''
+    cells = [cell for cell in range(game.b_size ** 2) if not game.has_cell(shots, cell)]
+    game.rng.shuffle(cells)
+    return cells
+
+def shooting_ai(difficulty, b_size, shots, rng):
+    '''
+    Returns a WaveWatch against a random fleet, after it took a share of
+    the board's cells as shots. At difficulty 3 its placement index is
+    built here, so the one-off build is not timed in the first call
+    '''
+    fleet = FLEETS[b_size]
+    ships = sample_fleet(b_size, fleet, rng=rng)
+    ai = WaveWatch(difficulty, b_size, fleet, rng)
+    ai.set_player_pos(ships, [cell for ship in ships for cell in ship])
+    for i in range(int(b_size ** 2 * shots)):
+        ai.get_shot()
+    if difficulty == 3:
+        lengths = [len(ship) for ship in ai.player_ships]
+        if ai.placement_index is None or not ai.placement_index.set_lengths(lengths):
+            ai.placement_index = PlacementIndex(b_size, lengths, ai.shots)
+    return ai
+
+### CASES ###
+def case_fire(b_size, shots, rng):
+    game = placed_game(b_size, shots, rng)
+    cells = iter(unshot_cells(game, game.player_shots))
+    def step():
+        game.set_turn(0)
+        game.fire(next(cells))
+    return step
+
+def case_opponent_fire(b_size, shots, rng):
+    game = placed_game(b_size, shots, rng)
+    cells = iter(unshot_cells(game, game.opp_shots))
+    def step():
+        game.set_turn(1)
+        game.opponent_fire(next(cells))
+    return step
+
+def case_check_sunk(b_size, shots, rng):
+    game = placed_game(b_size, shots, rng)
+    # fresh hits on both sides, each call resolves one like a shot would
+    cells = [(0, cell) for ship in game.opp_fleet.ships for cell in ship
+             if not game.has_cell(game.player_shots, cell)]
+    cells += [(1, cell) for ship in game.own_fleet.ships for cell in ship
+              if not game.has_cell(game.opp_shots, cell)]
+    rng.shuffle(cells)
+    cells = iter(cells)
+    def step():
+        turn, cell = next(cells)
+        game.set_turn(turn)
+        game.check_sunk(cell)
+    return step
+
+def case_randomize_placement(b_size, shots, rng):
+    game = Game(0, b_size, FLEETS[b_size], 1, seed=rng)
+    game.set_starter(0)
+    game.start_game()
+    for i in range(int(len(FLEETS[b_size]) * shots)):
+        game.start_place_ship()
+        game.place_ship()
+    ship = game.ship_sizes[game.ships_to_place - 1]
+    return lambda: game.randomize_placement(ship)
+
+def ai_case(difficulty):
+    def case(b_size, shots, rng):
+        return shooting_ai(difficulty, b_size, shots, rng).get_shot
+    return case
+
+def case_adv_search(b_size, shots, rng):
+    return shooting_ai(3, b_size, shots, rng).adv_search
+
+def case_build_positions(b_size, shots, rng):
+    ai = WaveWatch(1, b_size, FLEETS[b_size], rng)
+    def step():
+        ai.individual_ships = []
+        ai.ship_cells = []
+        ai.build_positions()
+    return step
+
+def case_encode(b_size, shots, rng):
+    ships = sample_fleet(b_size, FLEETS[b_size], rng=rng)
+    return lambda: encode('GAME_INFO', (ships, 1))
+
+def case_decode(b_size, shots, rng):
+    payload = encode('GAME_INFO', (sample_fleet(b_size, FLEETS[b_size], rng=rng), 1))
+    return lambda: decode(payload)
+
+# name: (case, phased, calls per repeat). Phased cases run once per
+# phase, calls is bounded by the free cells for cases that use them up
+CASES = {
+    'game.fire': (case_fire, True, 5),
+    'game.opponent_fire': (case_opponent_fire, True, 5),
+    'game.check_sunk': (case_check_sunk, True, 5),
+    'game.randomize_placement': (case_randomize_placement, True, 50),
+    'ai.get_shot.d1': (ai_case(1), True, 5),
+    'ai.get_shot.d2': (ai_case(2), True, 5),
+    'ai.get_shot.d3': (ai_case(3), True, 5),
+    'ai.adv_search': (case_adv_search, True, 5),
+    'ai.build_positions': (case_build_positions, False, 20),
+    'protocol.encode': (case_encode, False, 500),
+    'protocol.decode': (case_decode, False, 500),
+}
+
+### RUNNING ###
+def known_fault(error):
+    '''
+    Checks if an error is one of the AI's known faults: the None shot
+    handle_faults gives back, or a random choice out of no cells
+    '''
+    if isinstance(error, TypeError):
+        return 'NoneType' in str(error)
+    return isinstance(error, IndexError) and str(error) == EMPTY_CHOICE
+
+def first_good_seed(case, b_size, shots, calls):
+    '''
+    Returns the first seed from SEED whose setup and calls run without
+    hitting one of the AI's known faults, any other error is raised
+    '''
+    for seed in range(SEED, SEED + SEED_TRIES):
+        try:
+            step = case(b_size, shots, random.Random(seed))
+            for i in range(calls):
+                step()
+        except (TypeError, IndexError) as error:
+            if not known_fault(error):
+                raise
+            continue
+        return seed
+    raise Exception(f'Benchmark Error: No seed runs {case.__name__} on {b_size}x{b_size}')
+
+def measure(case, b_size, shots, calls, repeat):
+    '''
+    Returns the best time per call in microseconds. Every repeat sets
+    the case up again from the same seed, only the calls are timed
+    '''
+    seed = first_good_seed(case, b_size, shots, calls)
+    best = None
+    for i in range(repeat):
+        step = case(b_size, shots, random.Random(seed))
+        start = time.perf_counter()
+        for j in range(calls):
+            step()
+        took = time.perf_counter() - start
+        if best is None or took < best:
+            best = took
+    return best / calls * 1e6, seed
+
+def run(sizes=SIZES, cases=None, repeat=REPEAT):
+    '''
+    Runs the suite, returns the results document
+    '''
+    results = {}
+    for name in cases or CASES:
+        case, phased, calls = CASES[name]
+        for b_size in sizes:
+            phases = PHASES.items() if phased else [('all', 0)]
+            for phase, shots in phases:
+                took, seed = measure(case, b_size, shots, calls, repeat)
+                key = f'{name}/b{b_size}/{phase}'
+                results[key] = {'us': round(took, 3), 'calls': calls, 'seed': seed}
+                print(f'{key:<40}{took:>12.2f} us')
+    return {
+        'format': FORMAT,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+def compare(baseline, current, threshold):
+    '''
+    Prints every case of both documents side by side, returns the
+    keys that got slower than the baseline by more than threshold
+    '''
+    regressions = []
+    base, now = baseline['results'], current['results']
+    print(f"{'case':<40}{'base us':>12}{'now us':>12}{'change':>10}")
+    for key in base:
+        if key not in now:
+            print(f'{key:<40}{base[key]["us"]:>12.2f}{"-":>12}{"missing":>10}')
+            continue
+        change = now[key]['us'] / base[key]['us'] - 1
+        flag = '  REGRESSION' if change > threshold else ''
+        print(f'{key:<40}{base[key]["us"]:>12.2f}{now[key]["us"]:>12.2f}{change:>+10.1%}{flag}')
+        if flag:
+            regressions.append(key)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='BattleShell benchmark suite')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run the suite and write JSON results')
+    run_parser.add_argument('--out', default='bench.json')
+    run_parser.add_argument('--sizes', default=','.join(map(str, SIZES)), help='comma separated board sizes')
+    run_parser.add_argument('--cases', help='comma separated case names, defaults to all')
+    run_parser.add_argument('--repeat', type=int, default=REPEAT)
+    compare_parser = commands.add_parser('compare', help='flag regressions against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.15,
+                                help='allowed slowdown before flagging, 0.15 is 15%%')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        sizes = [int(size) for size in args.sizes.split(',')]
+        for size in sizes:
+            if size not in FLEETS:
+                raise Exception(f'Benchmark Error: No fleet for board size {size}')
+        cases = args.cases.split(',') if args.cases else None
+        document = run(sizes, cases, args.repeat)
+        with open(args.out, 'w') as out:
+            json.dump(document, out, indent=1)
+        print(f'Results written to {args.out}')
+        return
+
+    with open(args.baseline) as baseline, open(args.current) as current:
+        baseline, current = json.load(baseline), json.load(current)
+    for document in (baseline, current):
+        if document.get('format') != FORMAT:
+            raise Exception('Benchmark Error: Unsupported results format')
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f'{len(regressions)} regression(s) over {args.threshold:.0%}')
+        sys.exit(1)
+    print('No regressions')
+
+if __name__ == '__main__':
+    main()
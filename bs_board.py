@@ -0,0 +1,188 @@
+'''
+BattleShell Board V1.0
+
+A single Kivy widget that draws the whole game board onto its canvas.
+Every cell is a coloured, textured rectangle instead of its own Button,
+and touches are mapped back to a (row, col) from their coordinates, so
+layout and redraw cost no longer grow with the number of widgets.
+
+Cell icons come from one texture atlas (assets/cells.atlas) loaded once
+when the app is built, cells then refer to its regions by name. To change
+an icon, resize the images in assets to 252px and repack them with:
+   python -m kivy.atlas assets/cells 512 empty.png crosshair.png circle.png square.png
+
+Author: Paul Belland
+'''
+
+from kivy.atlas import Atlas
+from kivy.core.text import Label as CoreLabel
+from kivy.graphics import Color, InstructionGroup, Rectangle
+from kivy.metrics import dp, sp
+from kivy.uix.widget import Widget
+
+ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+AXIS_FONT_SIZE = 15   # sp, same as a default Button
+CELL_ATLAS = 'assets/cells.atlas'
+TEXTURES = {}   # atlas region name -> texture
+
+def load_textures(atlas_file=CELL_ATLAS):
+    '''
+    Loads the cell icon atlas, only needs to run once
+    '''
+    if not TEXTURES:
+        TEXTURES.update(Atlas(atlas_file).textures)
+
+class BoardWidget(Widget):
+    '''
+    Game board drawn with canvas instructions. Dispatches
+    on_cell_release(row, col) when a cell is clicked
+    '''
+    __events__ = ('on_cell_release',)
+
+    def __init__(self, **kwargs):
+        Widget.__init__(self, **kwargs)
+        self.b_size = 0
+        self.padding = dp(12)
+        self.spacing = dp(3)
+        self.cells = {}   # (row, col) -> (Color, Rectangle)
+        self.numbers = []   # axis label rectangles
+        self.letters = []
+        self.cell_group = InstructionGroup()
+        self.axis_group = InstructionGroup()
+        self.axis_group.add(Color(1, 1, 1, 1))
+        self.canvas.add(self.cell_group)
+        self.canvas.add(self.axis_group)
+        self.bind(pos=self.layout, size=self.layout)
+
+    def build(self, b_size, icon):
+        '''
+        Sets up an empty board of the given size. The instructions of
+        the last board are reset in place, only cells and labels for
+        the size difference are created or removed
+        '''
+        texture = TEXTURES[icon]
+
+        # drops cells outside of the new size
+        for row, col in list(self.cells):
+            if row >= b_size or col >= b_size:
+                colour, rect = self.cells.pop((row, col))
+                self.cell_group.remove(colour)
+                self.cell_group.remove(rect)
+
+        # resets kept cells and adds missing ones
+        for row in range(b_size):
+            for col in range(b_size):
+                if (row, col) in self.cells:
+                    colour, rect = self.cells[(row, col)]
+                    colour.rgba = (1, 1, 1, 1)
+                    rect.texture = texture
+                    continue
+                colour = Color(1, 1, 1, 1)
+                rect = Rectangle(texture=texture)
+                self.cell_group.add(colour)
+                self.cell_group.add(rect)
+                self.cells[(row, col)] = (colour, rect)
+
+        # axis numbers across the top and letters down the side
+        while len(self.numbers) > b_size:
+            self.axis_group.remove(self.numbers.pop())
+            self.axis_group.remove(self.letters.pop())
+        for i in range(len(self.numbers), b_size):
+            self.numbers.append(self.add_label(str(i + 1)))
+            self.letters.append(self.add_label(ALPHABET[i]))
+
+        self.b_size = b_size
+        self.layout()
+
+    def add_label(self, text):
+        '''
+        Adds an axis label to the canvas, returns its rectangle
+        '''
+        label = CoreLabel(text=text, font_size=sp(AXIS_FONT_SIZE))
+        label.refresh()
+        rect = Rectangle(texture=label.texture, size=label.texture.size)
+        self.axis_group.add(rect)
+        return rect
+
+    def set_cell(self, row, col, icon, colour):
+        '''
+        Changes the icon and colour of one cell
+        '''
+        cell_colour, rect = self.cells[(row, col)]
+        cell_colour.rgba = colour
+        rect.texture = TEXTURES[icon]
+
+    def cell_size(self):
+        '''
+        Returns the width and height of a cell, the axis takes up
+        one extra row and column
+        '''
+        slots = self.b_size + 1
+        width = (self.width - 2 * self.padding - self.spacing * self.b_size) / slots
+        height = (self.height - 2 * self.padding - self.spacing * self.b_size) / slots
+        return max(width, 0), max(height, 0)
+
+    def cell_pos(self, row, col):
+        '''
+        Returns the bottom left corner of a cell, rows count down from
+        the top and the axis sits in row and column -1
+        '''
+        width, height = self.cell_size()
+        x = self.x + self.padding + (col + 1) * (width + self.spacing)
+        y = self.top - self.padding - (row + 2) * height - (row + 1) * self.spacing
+        return x, y
+
+    def layout(self, *args):
+        '''
+        Positions every cell and axis label to fit the widget
+        '''
+        if not self.b_size:
+            return
+        width, height = self.cell_size()
+        for (row, col), (colour, rect) in self.cells.items():
+            rect.pos = self.cell_pos(row, col)
+            rect.size = (width, height)
+
+        # labels are centred in their axis cell
+        for i in range(self.b_size):
+            for rect, (x, y) in ((self.numbers[i], self.cell_pos(-1, i)),
+                                 (self.letters[i], self.cell_pos(i, -1))):
+                label_width, label_height = rect.texture.size
+                rect.pos = (x + (width - label_width) / 2, y + (height - label_height) / 2)
+
+    def cell_at(self, x, y):
+        '''
+        Returns the (row, col) under a window point, None if the
+        point is on the axis, in a gap or off the board
+        '''
+        width, height = self.cell_size()
+        if not self.b_size or not width or not height:
+            return None
+        across = x - self.x - self.padding
+        down = self.top - self.padding - y
+        col = int(across // (width + self.spacing)) - 1
+        row = int(down // (height + self.spacing)) - 1
+        if not (0 <= row < self.b_size and 0 <= col < self.b_size):
+            return None
+        if across % (width + self.spacing) > width or down % (height + self.spacing) > height:
+            return None
+        return row, col
+
+    def on_touch_down(self, touch):
+        if not self.collide_point(*touch.pos):
+            return Widget.on_touch_down(self, touch)
+        if self.cell_at(*touch.pos) is not None:
+            touch.grab(self)
+        return True
+
+    def on_touch_up(self, touch):
+        if touch.grab_current is not self:
+            return Widget.on_touch_up(self, touch)
+        touch.ungrab(self)
+        cell = self.cell_at(*touch.pos)
+        if cell is not None:
+            self.dispatch('on_cell_release', *cell)
+        return True
+
+    def on_cell_release(self, row, col):
+        pass
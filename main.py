@@ -8,6 +8,30 @@ settings and allows easy creation of BattleShell games with different settings.
 Author: Paul Belland
 '''
 
+# STARTUP TIMING, REPORTED WHEN BSHELL_STARTUP_TIMING IS SET
+import os
+import time
+STARTUP_TIMING = bool(os.environ.get('BSHELL_STARTUP_TIMING'))
+STARTUP_MARKS = [('start', time.perf_counter())]
+
+def startup_mark(label):
+    '''
+    Records when a startup step finished, if timing is on
+    '''
+    if STARTUP_TIMING:
+        STARTUP_MARKS.append((label, time.perf_counter()))
+
+def startup_report():
+    '''
+    Prints how long each startup step took
+    '''
+    start = last = STARTUP_MARKS[0][1]
+    print('Startup timing:')
+    for label, at in STARTUP_MARKS[1:]:
+        print(f'   {label:<16}{(at - last) * 1000:8.1f} ms')
+        last = at
+    print(f'   {"total":<16}{(last - start) * 1000:8.1f} ms')
+
 # SETS WINDOW SIZES MUST BE AT BEGINNING
 from kivy import Config
 Config.set('graphics', 'width', '880')
@@ -15,32 +39,33 @@ Config.set('graphics', 'height', '650')
 Config.set('graphics', 'minimum_width', '800')
 Config.set('graphics', 'minimum_height', '600')
 Config.set('input', 'mouse', 'mouse,disable_multitouch')
+startup_mark('kivy config')
 
-# BASIC IMPORTS
+# BASIC IMPORTS, dialogs and networking are imported on first use
 from kivy.lang import Builder
 from kivy.app import App
 from kivy.core.window import Window
 from kivy.uix.screenmanager import Screen
-from kivymd.uix.list import OneLineAvatarIconListItem, IconLeftWidget
-from kivymd.app import MDApp
-from kivymd.uix.button import MDRaisedButton
-from kivy.uix.button import Button
-from kivymd.uix.dialog import MDDialog
 from kivy.clock import Clock
-from kivymd.uix.snackbar import Snackbar
-from bshell import *  # game plug-in
-from bs_server import *
-from bs_client import *
+startup_mark('kivy')
+from kivymd.app import MDApp
+startup_mark('kivymd')
+from battleshell.bshell import Game  # game plug-in
+from battleshell.perf import hot, instrumented
+startup_mark('bshell')
+from bs_board import BoardWidget, load_textures   # BoardWidget is used in the kv
+startup_mark('bs_board')
 import random
 
 SETTINGS_FILE = 'settings.txt'
+RECORD_FILE = 'games.bsr'   # finished games are archived here, in the app's user data dir
 ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
-EMPTY_CELL = 'assets/empty.png'
-CROSSHAIR_CELL = 'assets/crosshair.png'
-SQUARE_CELL = 'assets/square.png'
-CIRCLE_CELL = 'assets/circle.png'
-AXIS_COLOUR = (0,0,0,0)
+EMPTY_CELL = 'empty'   # cell atlas regions
+CROSSHAIR_CELL = 'crosshair'
+SQUARE_CELL = 'square'
+CIRCLE_CELL = 'circle'
 
+@instrumented
 class GameScreen(Screen):
     
     ### GENERAL ###
@@ -100,10 +125,10 @@ class GameScreen(Screen):
             if result:
                 self.notification_box(result)
             if game.get_phase() == 2:
-                self.update_board(self.game.get_boards(0),'Loading...')
+                self.update_board(0,'Loading...')
                 self.start_game()
             else:
-                self.update_board(game.get_boards(0),'Placing Phase')
+                self.update_board(0,'Placing Phase')
             return True
         
     def check_ready(self):
@@ -116,7 +141,7 @@ class GameScreen(Screen):
                 self.game.set_opponent_ships(self.opponent_ships)
                 self.flip_coin()
             else:
-                self.update_board(self.game.get_boards(0),'Waiting...')
+                self.update_board(0,'Waiting...')
                 self.ids.helper_text.text = 'Opponent is placing'
         
     def start_game(self):
@@ -168,10 +193,9 @@ class GameScreen(Screen):
         Shows the coin flip along with result on the player's board
         '''
         app = App.get_running_app()
-        boards = self.game.get_boards()
         
         # change messages
-        self.update_board(boards[self.displayed_board],'Choosing Starter')
+        self.update_board(self.displayed_board,'Choosing Starter')
         if not app.randomize and not app.server_started:
             self.ids.helper_text.text = 'Starter locked!'
         else:
@@ -233,10 +257,11 @@ class GameScreen(Screen):
             self.game.set_starter(1)
             self.game.start_game()
             self.game.start_place_ship()
-            self.update_board(self.game.get_boards(0),'Placing Phase')
+            self.update_board(0,'Placing Phase')
             self.ids.helper_text.text = 'WASD / R / Enter'
             self.update_stats()
     
+    @hot
     def update_stats(self):
         '''
         Updates stat section of screen with newest info
@@ -267,6 +292,7 @@ class GameScreen(Screen):
         
         self.notification_box('New game starting!')
               
+    @hot
     def game_loop(self, wait=0):
         '''
         Main game loop
@@ -310,6 +336,7 @@ class GameScreen(Screen):
                 self.randomize = app.randomize
 
     ### GAME RELATED ###
+    @hot
     def ai_response(self,dt):
         '''
         Gets AI shot and displays to player
@@ -318,7 +345,7 @@ class GameScreen(Screen):
         
         result = self.game.get_ai_shot()
         self.displayed_board = 0
-        self.update_board(self.game.get_boards(0),'AI')
+        self.update_board(0,'AI')
         response = self.game.check_game_over()
         
         if response != False:
@@ -327,6 +354,7 @@ class GameScreen(Screen):
             self.ids.helper_text.text = result
             Clock.schedule_once(self.opp_done,app.game_delay + 0.5)
 
+    @hot
     def opp_response(self, cell):
         '''
         Fires opponent shot on players screen
@@ -334,7 +362,7 @@ class GameScreen(Screen):
         app = App.get_running_app()
         
         result = self.game.set_opponent_shot(cell)
-        self.update_board(self.game.get_boards(0),f'{app.opp_name}')
+        self.update_board(0,f'{app.opp_name}')
         response = self.game.check_game_over()
         
         if response != False:
@@ -347,10 +375,11 @@ class GameScreen(Screen):
         '''
         Handles reset back to player shot after AI shot
         '''
-        self.update_board(self.game.get_boards(1),'Your Turn')
+        self.update_board(1,'Your Turn')
         self.ids.helper_text.text = 'Good luck!'
         self.displayed_board = 1
             
+    @hot
     def handle_turns(self,dt):
         '''
         Handles changing turns after each shot
@@ -358,49 +387,65 @@ class GameScreen(Screen):
         app = App.get_running_app()
         game = self.game
         turn = game.get_turn()
-        board = game.get_curr_board()
+        board = 1 if turn == 0 else 0   # same board as get_curr_board
         if turn == 0:
             self.update_board(board,'Your Turn')
         else:
             self.update_board(board,f'{app.opp_name}')
     
-    def update_board(self,information,player):
+    @hot
+    def update_board(self,choice,player):
         '''
-        When called updates the entirety of the board cells with
-        the information provided (ie. hits, missed, etc.) and changes
-        turn text.
+        When called updates the board cells with the information of
+        the chosen board (0 own, 1 shots) and changes turn text.
+        Only cells changed since the last paint are redrawn, unless
+        the board, game or icon has changed
         '''
         app = App.get_running_app()
+        game = self.game
         self.active_board_message = player
-        board_dict = self.board_dict
-        for i in range(len(information)):
-            for j in range(len(information[i])):
-                value = information[i][j]
-                if value == 0:
-                    symbol = EMPTY_CELL
-                else:
-                    if app.game_icon == 0:
-                        symbol = CROSSHAIR_CELL
-                    elif app.game_icon == 1:
-                        symbol = CIRCLE_CELL
-                    else:
-                        symbol = SQUARE_CELL
-                    
-                if value == 0:
-                    colour = [1,1,1,1]
-                if value == 1:
-                    colour = [1,1,1,1]
-                elif value == 2:
-                    colour = [1,0,0,1]
-                elif value == 3:
-                    colour = [1, 0.812, 0.137, 1]
-                elif value == 5:
-                    colour = [0.067, 0.424, 1, 1]
-                    
-                board_dict[(i,j)].background_normal = symbol
-                board_dict[(i,j)].background_color = colour
+        information = game.get_boards(choice)
+        painted = (game, choice, app.game_icon)
+        if painted != self.painted:
+            cells = [(i,j) for i in range(len(information))
+                     for j in range(len(information[i]))]
+            self.painted = painted
+            game.get_changes(choice)   # all drawn, clears the pending ones
+        else:
+            cells = [game.num_to_matrix(cell) for cell in game.get_changes(choice)]
+
+        board = self.ids.board_layout
+        for i, j in cells:
+            symbol, colour = self.cell_style(information[i][j], app.game_icon)
+            board.set_cell(i, j, symbol, colour)
         self.turn_box(player)
         self.update_stats()
+
+    def cell_style(self, value, icon):
+        '''
+        Returns the image and colour of a board cell value
+        '''
+        if value == 0:
+            symbol = EMPTY_CELL
+        else:
+            if icon == 0:
+                symbol = CROSSHAIR_CELL
+            elif icon == 1:
+                symbol = CIRCLE_CELL
+            else:
+                symbol = SQUARE_CELL
+            
+        if value == 0:
+            colour = [1,1,1,1]
+        if value == 1:
+            colour = [1,1,1,1]
+        elif value == 2:
+            colour = [1,0,0,1]
+        elif value == 3:
+            colour = [1, 0.812, 0.137, 1]
+        elif value == 5:
+            colour = [0.067, 0.424, 1, 1]
+        return symbol, colour
         
     ### GUI RELATED ###
     def dismiss_dialog(self):
@@ -414,6 +459,8 @@ class GameScreen(Screen):
         '''
         Resignation handling
         '''
+        from kivymd.uix.button import MDRaisedButton
+        from kivymd.uix.dialog import MDDialog
         rsn = MDRaisedButton(
             text="RESIGN", md_bg_color='#fc5c65')
         cancel = MDRaisedButton(
@@ -437,7 +484,6 @@ class GameScreen(Screen):
         '''
         app = App.get_running_app()
         game = self.game
-        boards = game.get_boards()
         
         # cases
         single_player = game.get_turn() == 0 and game.get_phase() != 1
@@ -453,9 +499,9 @@ class GameScreen(Screen):
                 self.displayed_board = 1
                 self.notification_box('Now viewing your shots')
             if self.turn == 1:
-                self.update_board(boards[self.displayed_board],'Your Turn')
+                self.update_board(self.displayed_board,'Your Turn')
             else:
-                self.update_board(boards[self.displayed_board],f'{app.opp_name}')
+                self.update_board(self.displayed_board,f'{app.opp_name}')
         else:
             self.notification_box('Cannot view until your turn')
             
@@ -471,6 +517,7 @@ class GameScreen(Screen):
         displays whatever text is passed
         '''
         if not self.current_not:
+            from kivymd.uix.snackbar import Snackbar
             notification = Snackbar(
                 text=text,
                 radius=[10,10,10,10],
@@ -505,37 +552,23 @@ class GameScreen(Screen):
         self.fire_btn()
         Clock.schedule_once(self.refocus_box)
             
+    @hot
     def populate_board(self, dt):
         '''
-        Fills in Game Board based off of settings
+        Fills in Game Board based off of settings, the last
+        board's cells are reset and reused where the size allows
         '''
         app = App.get_running_app()
         if not app.in_progress:
-            self.remove_grid()
-            self.board_dict = {}
-            b_size = self.b_size
-            
-            grid_layout = self.ids.board_layout
-            grid_layout.cols =  b_size + 1
-            grid_layout.add_widget(Button(background_color=(0,0,0,0)))
-            
-            # build board
-            for i in range(0,b_size):   # creates top numbers
-                button = Button(text = f"{i+1}",background_color=(AXIS_COLOUR))
-                grid_layout.add_widget(button)
-            
-            # creates each individual row
-            for row in range(0,b_size):
-                letter = ALPHABET[row]
-                button = Button(text = letter,background_color=(AXIS_COLOUR))
-                grid_layout.add_widget(button)
-                for i in range(0,b_size):
-                    display_str = f"{letter}{i+1}"
-                    button = Button(background_normal = 'empty.png')
-                    self.board_dict[(row,i)] = button
-                    button.bind(on_release=lambda instance,  # makes box clickable
-                                x=display_str: self.update_box_text(x))
-                    grid_layout.add_widget(button)
+            self.painted = None   # new cells need a full paint
+            self.ids.board_layout.build(self.b_size, EMPTY_CELL)
+
+    @hot
+    def press_cell(self, row, col):
+        '''
+        Handles a click on a board cell
+        '''
+        self.update_box_text(f"{ALPHABET[row]}{col+1}")
             
     def update_box_text(self,string):
         '''
@@ -550,14 +583,6 @@ class GameScreen(Screen):
                 return
         self.last_press = string
     
-    def remove_grid(self):
-        '''
-        Clears entire board
-        '''
-        rows = [i for i in self.ids.board_layout.children]
-        for row1 in rows:
-            self.ids.board_layout.remove_widget(row1)
-            
     def verify_coords(self,coords):
         '''
         Verifies input of entered coords
@@ -578,6 +603,7 @@ class GameScreen(Screen):
             return False
         return True  
 
+    @hot
     def fire_btn(self):
         '''
         Handles all logic for fire button
@@ -605,10 +631,10 @@ class GameScreen(Screen):
                 game_result = self.game.check_game_over()
                 
                 if game_result != False:
-                    self.update_board(self.game.get_boards(1),'Game over!')
+                    self.update_board(1,'Game over!')
                     self.game_over(0, game_result)
                 else:
-                    self.update_board(self.game.get_boards(1),'Switching...')
+                    self.update_board(1,'Switching...')
                     self.ids.helper_text.text = result
                     self.game_loop()
             else:
@@ -626,7 +652,7 @@ class GameScreen(Screen):
         whether someone resigns
         '''
         app = App.get_running_app()
-        self.update_board(self.game.get_boards(self.displayed_board),'Game Over!')
+        self.update_board(self.displayed_board,'Game Over!')
 
         # resignation/winner result logic
         if mode == 0:
@@ -641,6 +667,12 @@ class GameScreen(Screen):
                 message = 'You resigned!'
         else:
             message = f'{app.opp_name} resigned!'
+
+        # archives the game once
+        if app.in_progress:
+            from battleshell.record import RecordWriter
+            with RecordWriter(os.path.join(app.user_data_dir, RECORD_FILE)) as records:
+                records.write(self.game)
             
         app.in_progress = False
         self.start_new = True
@@ -655,6 +687,7 @@ class SettingsScreen(Screen):
         '''
         Sets settings properly on open
         '''
+        from kivymd.uix.list import OneLineAvatarIconListItem, IconLeftWidget
         app = App.get_running_app()
         self.ids.ship_list.clear_widgets()
 
@@ -686,6 +719,8 @@ class SettingsScreen(Screen):
         '''
         Shows dialog when removing ship from game settings
         '''
+        from kivymd.uix.button import MDRaisedButton
+        from kivymd.uix.dialog import MDDialog
         confirm = MDRaisedButton(
             text="YES", md_bg_color='limegreen', font_size='20dp')
         
@@ -706,6 +741,7 @@ class SettingsScreen(Screen):
         '''
         Adds new ship to list based on size
         '''
+        from kivymd.uix.list import OneLineAvatarIconListItem, IconLeftWidget
         size = self.ids.ship_size.text
         line_item = OneLineAvatarIconListItem(
                 IconLeftWidget(icon="sail-boat"))
@@ -724,6 +760,8 @@ class SettingsScreen(Screen):
         Creates a dialog that does nothing. Confirmation dialog.
         Title and message can be given.
         '''
+        from kivymd.uix.button import MDRaisedButton
+        from kivymd.uix.dialog import MDDialog
         confirm = MDRaisedButton(
             text="OK", md_bg_color='limegreen', font_size='20dp')
         
@@ -861,6 +899,7 @@ class SettingsScreen(Screen):
             message = 'There was a problem applying\nthe following setting(s):'
             self.ok_dialog(message,problem)
 
+@instrumented
 class MultiplayerScreen(Screen):
     def validate_name(self):
         '''
@@ -882,17 +921,20 @@ class MultiplayerScreen(Screen):
                 self.ids.multi_helper.text = self.validate_name()
             else:
                 # start server
+                from battleshell.bs_server import Server
                 self.server = Server(self.ids.multi_name.text)
                 self.client = None
-                self.ids.multi_disp.title = self.server.run()
+                response = self.server.run()
+                self.ids.multi_disp.title = response
                 self.ids.multi_helper.text = 'You are now hosting a server'
                 self.ids.connected_self.text = self.ids.multi_name.text
                 self.ids.host.text = 'Stop hosting'
                 self.ids.host.md_bg_color = 'red'
                 app.my_name = self.ids.multi_name.text
                 
-                # check for opponent connection and response
-                self.host_clock = Clock.schedule_interval(self.update_host, 1)
+                # handles opponent connection and response as they arrive
+                if response == 'Waiting for opponent...':
+                    self.server.listen(self.wake_host)
         
         else:
             
@@ -920,35 +962,32 @@ class MultiplayerScreen(Screen):
         if self.server:
             self.server.close()
             self.server = None
-            self.host_clock.cancel()
         if self.client:
             self.client.close()
             self.client = None
-            self.client_clock.cancel()
             
         app = App.get_running_app()
         app.server_started = False
         app.opp_name = None
         
+    def wake_host(self):
+        '''
+        Called from the server's listener thread when packets arrive,
+        handles them on the next frame of the main thread
+        '''
+        Clock.schedule_once(self.update_host)
+
+    @hot
     def update_host(self, dt):
         '''
         Handles all information received from connected client
         '''
         app = App.get_running_app()
+        if not self.server:   # stopped hosting before this ran
+            return
         
-        # wait for connection
-        if app.server_started == False:
-            response = self.server.search()
-            if response != False:
-                self.ids.multi_disp.title = response
-                app.server_started = True
-                app.root.ids.icon_opponent.icon = 'account-multiple'
-                self.manager.get_screen('sc_game').new_game()
-                app.in_progress = False   
-                
-        # opponent response
-        if app.server_started == True:
-            ident, data = self.server.refresh()
+        # opponent connection and response
+        for ident, data in self.server.refresh():
             if data:
                 if ident == 'Name':
                     app.opp_name = data
@@ -958,6 +997,7 @@ class MultiplayerScreen(Screen):
                 else:
                     self.handle_received(ident, data)
                     
+    @hot
     def handle_received(self,ident,data):
         '''
         Handles any received response from opponent
@@ -987,6 +1027,7 @@ class MultiplayerScreen(Screen):
                 self.ids.multi_helper.text = self.validate_name()
             else:
                 # start client and connect to main server
+                from battleshell.bs_client import Client
                 self.client = Client(self.ids.multi_name.text)
                 self.server = None
                 app.server_started = True
@@ -999,7 +1040,7 @@ class MultiplayerScreen(Screen):
                     self.ids.connect.text = 'Disconnect'
                     self.ids.connect.md_bg_color = 'red'
                     self.ids.connected_self.text = self.ids.multi_name.text
-                    self.client_clock = Clock.schedule_interval(self.update_client, 1)
+                    self.client.listen(self.wake_client)
                     app.root.ids.icon_opponent.icon = 'account-multiple'
                     self.manager.get_screen('sc_game').new_game()
                     self.manager.get_screen('sc_game').notification_box('P2 Connected!')
@@ -1008,6 +1049,14 @@ class MultiplayerScreen(Screen):
         else:
             self.reset_multi()
         
+    def wake_client(self):
+        '''
+        Called from the client's listener thread when packets arrive,
+        handles them on the next frame of the main thread
+        '''
+        Clock.schedule_once(self.update_client)
+
+    @hot
     def update_client(self, dt):    
         '''
         Handles all information received from host
@@ -1015,22 +1064,33 @@ class MultiplayerScreen(Screen):
         app = App.get_running_app() 
         
         # opponent response
-        if app.server_started == True:
-            ident, data = self.client.refresh()
-            if data:
-                if ident == 'Name':
-                    app.opp_name = data
-                    self.ids.connected_opp.text = data
-                    self.client.send('Name',app.my_name)
-                elif ident == 'Status':
-                    self.handle_status(data)
-                else:
-                    self.handle_received(ident, data)
+        if app.server_started == True and self.client:
+            for ident, data in self.client.refresh():
+                if data:
+                    if ident == 'Name':
+                        app.opp_name = data
+                        self.ids.connected_opp.text = data
+                        self.client.send('Name',app.my_name)
+                    elif ident == 'Status':
+                        self.handle_status(data)
+                    else:
+                        self.handle_received(ident, data)
                     
     def handle_status(self, data):
         '''
         Handles status data sent through socket
         '''
+        app = App.get_running_app()
+        if data == 'Connected':   # opponent joined the hosted server
+            self.ids.multi_disp.title = 'Connected to opponent!'
+            app.server_started = True
+            app.root.ids.icon_opponent.icon = 'account-multiple'
+            self.manager.get_screen('sc_game').new_game()
+            app.in_progress = False
+        if data == 'Incompatible':
+            self.manager.get_screen('sc_game').notification_box('P2 version not supported')
+            self.manager.get_screen('sc_game').game_over(1)
+            self.reset_multi()
         if data == 'Disconnected':
             self.manager.get_screen('sc_game').notification_box('P2 Disconnected')
             self.manager.get_screen('sc_game').game_over(1)
@@ -1039,15 +1099,45 @@ class MultiplayerScreen(Screen):
 class AboutScreen(Screen):
     pass
 
+# screens built on their first visit: name -> kv file, screen class
+LAZY_SCREENS = {
+    'sc_settings': ('kv/settings.kv', SettingsScreen),
+    'sc_multi': ('kv/multiplayer.kv', MultiplayerScreen),
+    'sc_about': ('kv/about.kv', AboutScreen),
+}
+
 class BattleShell(MDApp):
     def build(self):
         self.theme_cls.theme_style = "Dark"
         self.theme_cls.material_style = 'M3'
+        load_textures()
         self.root = Builder.load_file('BattleShell.kv')
+        startup_mark('build')
         return self.root
+
+    def show_screen(self, name):
+        '''
+        Switches screens, building the screen on its first visit
+        '''
+        manager = self.root.ids.sc_manager
+        if not manager.has_screen(name):
+            kv_file, screen = LAZY_SCREENS[name]
+            Builder.load_file(kv_file)
+            manager.add_widget(screen())
+        manager.current = name
+
+    def first_frame(self, window):
+        '''
+        Reports startup timing once the first frame is drawn
+        '''
+        window.unbind(on_flip=self.first_frame)
+        startup_mark('first frame')
+        startup_report()
     
     def on_start(self):
         '''Reads settings file'''
+        if STARTUP_TIMING:
+            Window.bind(on_flip=self.first_frame)
         self.in_progress = False
         self.server_started = False
         self.opp_name = None